@@ -0,0 +1,139 @@
+##############################################################################
+#
+# Copyright (c) 2009 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+""" content types availability benchmark
+
+Compare per-type `isAvailable` checks with bulk `availableTypes` for
+registry with hundreds of content types, cost of binding content types
+and reading attributes of bound content types.
+
+  python benchmarks/availability.py [--types=300] [--rounds=50]
+
+$Id$
+"""
+import sys, time, optparse
+
+from zope import interface, component
+from zope.app.testing import placelesssetup
+from zope.security import management
+
+from zojax.content.type import interfaces, checker, testing
+from zojax.content.type.contenttype import ContentType, availableTypes
+from zojax.content.type.container import ContentContainer
+from zojax.content.type.zcml import ClassToTypeAdapter, contentTypeConstraints
+
+
+class IBenchContainer(interface.Interface):
+    pass
+
+
+class BenchContainer(ContentContainer):
+    interface.implements(IBenchContainer)
+
+
+def registerType(name, schema=interface.Interface, klass=None):
+    ct = ContentType(name, schema, klass, name, u'', 'zope.View')
+    interface.alsoProvides(ct, interfaces.IActiveType)
+    component.provideUtility(ct, interfaces.IActiveType, name)
+    component.provideUtility(ct, interfaces.IContentType, name)
+    contentTypeConstraints(name, (), (), None)
+    return ct
+
+
+def setUp(types):
+    placelesssetup.setUp()
+    management.endInteraction()
+    testing.setUpContents()
+    component.provideAdapter(
+        checker.PermissionChecker, name='zojax.content-permissionChecker')
+
+    registerType('bench.container', IBenchContainer, BenchContainer)
+    component.provideAdapter(
+        ClassToTypeAdapter('bench.container'),
+        (IBenchContainer,), interfaces.IContentType)
+
+    for idx in range(types):
+        registerType('bench.type%d'%idx)
+
+    return BenchContainer()
+
+
+def bench(title, func, rounds):
+    t0 = time.time()
+    for i in range(rounds):
+        management.newInteraction()
+        func()
+        management.endInteraction()
+    t = (time.time() - t0) / rounds
+    print '%-40s %8.3f ms'%(title, t * 1000)
+
+
+def main(args=None):
+    parser = optparse.OptionParser()
+    parser.add_option('--types', type='int', default=300)
+    parser.add_option('--rounds', type='int', default=50)
+    options, args = parser.parse_args(args)
+
+    container = setUp(options.types)
+    ct = interfaces.IContentType(container)
+    names = [c.name for c in ct.listContainedTypes(False)]
+    print '%s content types, %s rounds'%(len(names), options.rounds)
+
+    def perType():
+        return [c for c in ct.listContainedTypes(False) if c.isAvailable()]
+
+    def bulk():
+        return availableTypes(container)
+
+    def bulkNames():
+        return availableTypes(container, names[::2])
+
+    def twoMenus():
+        availableTypes(container)
+        availableTypes(container)
+
+    unbound = [component.getUtility(interfaces.IContentType, name)
+               for name in names]
+
+    def bind():
+        return [c.__bind__(container) for c in unbound]
+
+    bound = bind()
+
+    def readAttributes():
+        for i in range(20):
+            for c in bound:
+                c.name, c.title, c.permission, c.context
+
+    def menu():
+        return [(c.name, c.title, c.description)
+                for c in ct.listContainedTypes()]
+
+    management.newInteraction()
+    assert len(perType()) == len(bulk())
+    management.endInteraction()
+
+    bench('per-type isAvailable', perType, options.rounds)
+    bench('availableTypes(container)', bulk, options.rounds)
+    bench('availableTypes(container, names)', bulkNames, options.rounds)
+    bench('availableTypes x2 (one interaction)', twoMenus, options.rounds)
+    bench('bind all types', bind, options.rounds)
+    bench('20 x 4 attribute reads of bound types', readAttributes,
+          options.rounds)
+    bench('listContainedTypes with titles', menu, options.rounds)
+
+    placelesssetup.tearDown()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,83 @@
+##############################################################################
+#
+# Copyright (c) 2009 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+""" single btree and sharded content containers with many items
+
+Time of add (`_setitemf`, as used by `setitem`), lookup of random names,
+iteration of all keys and `len()` for `ContentContainer` and
+`ShardedContentContainer`. Containers are not stored to database,
+10M items need several GB of memory.
+
+  python benchmarks/container_shards.py [--sizes=10000,1000000,10000000]
+      [--lookups=100000] [--shards=64]
+
+$Id$
+"""
+import sys, time, random, optparse
+
+from zojax.content.type.container import \
+    ContentContainer, ShardedContentContainer
+
+
+def run(factory, size, lookups):
+    container = factory()
+    names = [u'item-%d'%idx for idx in xrange(size)]
+    random.shuffle(names)
+
+    t0 = time.time()
+    for name in names:
+        container._setitemf(name, 1)
+    add = (time.time() - t0) / size * 1000000
+
+    sample = [random.choice(names) for idx in xrange(lookups)]
+    t0 = time.time()
+    for name in sample:
+        container[name]
+    lookup = (time.time() - t0) / lookups * 1000000
+
+    t0 = time.time()
+    for name in container.keys():
+        pass
+    iterate = time.time() - t0
+
+    t0 = time.time()
+    for idx in xrange(1000):
+        len(container)
+    length = (time.time() - t0) * 1000
+
+    assert len(container) == size
+    return add, lookup, iterate, length
+
+
+def main(args=None):
+    parser = optparse.OptionParser()
+    parser.add_option('--sizes', default='10000,1000000,10000000')
+    parser.add_option('--lookups', type='int', default=100000)
+    parser.add_option('--shards', type='int', default=64)
+    options, args = parser.parse_args(args)
+
+    ShardedContentContainer.SHARDS = options.shards
+
+    print '%10s %10s %10s %10s %10s %10s'%(
+        'items', 'container', 'add usec', 'get usec', 'iter sec', 'len usec')
+
+    for size in [int(s) for s in options.sizes.split(',')]:
+        for title, factory in (('btree', ContentContainer),
+                               ('sharded', ShardedContentContainer)):
+            print '%10d %10s %10.2f %10.2f %10.2f %10.2f'%(
+                (size, title) + run(factory, size, options.lookups))
+            sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,74 @@
+##############################################################################
+#
+# Copyright (c) 2009 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+""" name allocation for many items with same name
+
+Container lookups and time of `chooseName` for container with `k` items
+that share name, for probing of zope name chooser (previous versions)
+and for suffix index.
+
+  python benchmarks/namechooser.py [--sizes=100,1000,10000] [--ops=100]
+
+$Id$
+"""
+import sys, time, optparse
+
+from zope.app.container.contained import NameChooser
+
+from zojax.content.type.container import SuffixNameChooser
+
+from support import Container
+
+
+class CountingContainer(Container):
+    """ counts name lookups of name choosers """
+
+    lookups = 0
+
+    def __contains__(self, name):
+        self.lookups += 1
+        return name in self.data
+
+
+def run(factory, size, ops):
+    container = CountingContainer()
+    chooser = factory(container)
+    for idx in xrange(size):
+        container[chooser.chooseName(u'meeting-notes', None)] = idx
+
+    container.lookups = 0
+    t0 = time.time()
+    for idx in xrange(ops):
+        container[chooser.chooseName(u'meeting-notes', None)] = idx
+    elapsed = time.time() - t0
+
+    return float(container.lookups) / ops, elapsed / ops * 1000000
+
+
+def main(args=None):
+    parser = optparse.OptionParser()
+    parser.add_option('--sizes', default='100,1000,10000')
+    parser.add_option('--ops', type='int', default=100)
+    options, args = parser.parse_args(args)
+
+    print '%10s %12s %12s %12s %12s  (per chooseName)'%(
+        'same name', 'probe look', 'probe usec', 'index look', 'index usec')
+
+    for size in [int(s) for s in options.sizes.split(',')]:
+        print '%10d %12.1f %12.1f %12.1f %12.1f'%(
+            (size,) + run(NameChooser, size, options.ops)
+            + run(SuffixNameChooser, size, options.ops))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
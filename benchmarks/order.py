@@ -0,0 +1,91 @@
+##############################################################################
+#
+# Copyright (c) 2009 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+""" container order scaling benchmark
+
+Per operation cost of IOrder add, remove, contains, last key and
+position lookups for containers from 1k to 1M items, cost should
+stay flat.
+
+  python benchmarks/order.py [--sizes=1000,10000,100000,1000000] [--ops=1000]
+
+$Id$
+"""
+import sys, time, optparse
+
+from zojax.content.type.order import AnnotatableOrder
+
+from support import NamesContainer
+
+
+def prefill(order, size):
+    for idx in xrange(size):
+        order.addItem('item%d'%idx)
+
+
+def bench(order, size, ops):
+    names = ['new%d'%idx for idx in xrange(ops)]
+    result = []
+
+    t0 = time.time()
+    for name in names:
+        order.addItem(name)
+    result.append(time.time() - t0)
+
+    t0 = time.time()
+    for name in names:
+        name in order.border
+    result.append(time.time() - t0)
+
+    t0 = time.time()
+    for name in names:
+        order.nextKey()
+    result.append(time.time() - t0)
+
+    t0 = time.time()
+    for name in names:
+        order.keyPosition(name)
+    result.append(time.time() - t0)
+
+    t0 = time.time()
+    for idx in xrange(1, ops+1):
+        order.keyAtPosition(idx * size // ops)
+    result.append(time.time() - t0)
+
+    t0 = time.time()
+    for name in names:
+        order.removeItem(name)
+    result.append(time.time() - t0)
+
+    return [t / ops * 1000000 for t in result]
+
+
+def main(args=None):
+    parser = optparse.OptionParser()
+    parser.add_option('--sizes', default='1000,10000,100000,1000000')
+    parser.add_option('--ops', type='int', default=1000)
+    options, args = parser.parse_args(args)
+
+    print '%10s %10s %10s %10s %10s %10s %10s  (usec per operation)'%(
+        'items', 'add', 'contains', 'last key', 'position', 'at pos',
+        'remove')
+
+    for size in [int(s) for s in options.sizes.split(',')]:
+        order = AnnotatableOrder(NamesContainer())
+        prefill(order, size)
+        print '%10d %10.2f %10.2f %10.2f %10.2f %10.2f %10.2f'%(
+            (size,) + tuple(bench(order, size, options.ops)))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
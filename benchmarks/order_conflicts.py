@@ -0,0 +1,130 @@
+##############################################################################
+#
+# Copyright (c) 2009 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+""" concurrent appends to container order
+
+Several threads add items to same container in local FileStorage,
+each add is separate transaction, conflicting transactions are retried.
+Reports conflict rate for sequential keys (previous versions) and
+for spaced random keys.
+
+  python benchmarks/order_conflicts.py [--threads=8] [--adds=200] [--work=0.002]
+
+$Id$
+"""
+import os, sys, time, shutil, tempfile, optparse, threading
+
+import transaction
+from ZODB import DB
+from ZODB.FileStorage import FileStorage
+from ZODB.POSException import ConflictError
+
+from zojax.content.type.order import AnnotatableOrder
+
+from support import Container
+
+
+class SequentialOrder(AnnotatableOrder):
+    """ key generation of previous versions """
+
+    def generateKey(self, item):
+        try:
+            return self.order.maxKey() + 1
+        except ValueError:
+            return 1
+
+
+def worker(db, factory, tid, adds, work, stats):
+    tm = transaction.TransactionManager()
+    conn = db.open(transaction_manager=tm)
+
+    commits = conflicts = 0
+    for idx in xrange(adds):
+        name = 'item-%d-%d'%(tid, idx)
+        while True:
+            tm.begin()
+            try:
+                container = conn.root()['container']
+                container.add(name, 1)
+                factory(container).addItem(name)
+                time.sleep(work)
+                tm.commit()
+                commits += 1
+                break
+            except ConflictError:
+                tm.abort()
+                conflicts += 1
+
+    conn.close()
+    stats.append((commits, conflicts))
+
+
+def run(factory, options):
+    tmp = tempfile.mkdtemp()
+    try:
+        db = DB(FileStorage(os.path.join(tmp, 'Data.fs')))
+
+        conn = db.open()
+        container = conn.root()['container'] = Container()
+        factory(container)
+        transaction.commit()
+        conn.close()
+
+        stats = []
+        threads = [threading.Thread(
+                target=worker,
+                args=(db, factory, tid, options.adds, options.work, stats))
+                   for tid in range(options.threads)]
+
+        t0 = time.time()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.time() - t0
+
+        conn = db.open()
+        order = factory(conn.root()['container'])
+        names = list(order.keys())
+        assert len(names) == len(order) == options.threads * options.adds
+        assert sorted(names) == sorted(conn.root()['container'].keys())
+        conn.close()
+        db.close()
+    finally:
+        shutil.rmtree(tmp)
+
+    commits = sum([s[0] for s in stats])
+    conflicts = sum([s[1] for s in stats])
+    return commits, conflicts, elapsed
+
+
+def main(args=None):
+    parser = optparse.OptionParser()
+    parser.add_option('--threads', type='int', default=8)
+    parser.add_option('--adds', type='int', default=200)
+    parser.add_option('--work', type='float', default=0.002)
+    options, args = parser.parse_args(args)
+
+    print '%12s %10s %10s %10s %10s'%(
+        'keys', 'commits', 'conflicts', 'rate', 'seconds')
+
+    for title, factory in (('sequential', SequentialOrder),
+                           ('spaced', AnnotatableOrder)):
+        commits, conflicts, elapsed = run(factory, options)
+        print '%12s %10d %10d %9.1f%% %10.2f'%(
+            title, commits, conflicts,
+            100.0 * conflicts / (commits + conflicts), elapsed)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
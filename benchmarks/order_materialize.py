@@ -0,0 +1,99 @@
+##############################################################################
+#
+# Copyright (c) 2009 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+""" first add to container without order annotation
+
+Time and bytes written by transaction that adds first item to existing
+container without order annotation, for full rebuild of order (previous
+versions) and for incremental order.
+
+  python benchmarks/order_materialize.py [--sizes=1000,10000,100000]
+
+$Id$
+"""
+import sys, time, optparse
+
+import transaction
+from persistent import Persistent
+from ZODB import DB
+from ZODB.MappingStorage import MappingStorage
+
+from zope.annotation.interfaces import IAnnotations
+
+from zojax.content.type.order import AnnotatableOrder
+
+from support import Container
+
+
+class Item(Persistent):
+    pass
+
+
+class RebuildOrder(AnnotatableOrder):
+    """ order of previous versions, rebuilt on first access """
+
+    def __init__(self, context):
+        annotations = IAnnotations(context)
+        if self.ANNOTATION_KEY not in annotations:
+            self.context = context
+            self.annotations = annotations
+            self.rebuild()
+        super(RebuildOrder, self).__init__(context)
+
+
+def firstAdd(db, factory):
+    conn = db.open()
+    container = conn.root()['container']
+
+    before = db.storage.getSize()
+    t0 = time.time()
+    container.add('new', Item())
+    factory(container).addItem('new')
+    transaction.commit()
+    elapsed = time.time() - t0
+    size = db.storage.getSize() - before
+
+    conn.close()
+    return elapsed * 1000, size
+
+
+def main(args=None):
+    parser = optparse.OptionParser()
+    parser.add_option('--sizes', default='1000,10000,100000')
+    options, args = parser.parse_args(args)
+
+    print '%10s %12s %12s %12s %12s  (first add)'%(
+        'items', 'rebuild ms', 'bytes', 'lazy ms', 'bytes')
+
+    for size in [int(s) for s in options.sizes.split(',')]:
+        results = []
+        for factory in (RebuildOrder, AnnotatableOrder):
+            db = DB(MappingStorage())
+            conn = db.open()
+            container = conn.root()['container'] = Container()
+            for idx in xrange(size):
+                container.add('item%06d'%idx, Item())
+                if not idx % 10000:
+                    transaction.commit()
+            transaction.commit()
+            conn.cacheMinimize()
+            conn.close()
+
+            results.extend(firstAdd(db, factory))
+            db.close()
+
+        print '%10d %12.1f %12d %12.1f %12d'%((size,) + tuple(results))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
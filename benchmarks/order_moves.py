@@ -0,0 +1,116 @@
+##############################################################################
+#
+# Copyright (c) 2009 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+""" drag and drop in large container
+
+Objects and bytes written by one transaction that moves a block of
+items, for `updateOrder`, `moveToPosition` and `moveAfter`.
+
+  python benchmarks/order_moves.py [--size=20000] [--block=3] [--moves=20]
+
+$Id$
+"""
+import sys, time, random, optparse
+
+import transaction
+from ZODB import DB
+from ZODB.MappingStorage import MappingStorage
+
+from zope.component import testing
+
+from zojax.content.type.order import Reordable
+
+from support import Container
+
+
+def drag(order, names, position):
+    keys = list(order.keys())
+    for name in names:
+        keys.remove(name)
+    keys[position-1:position-1] = names
+    return lambda: order.updateOrder(keys)
+
+
+def moveAfter(order, names, position):
+    keys = [key for key in order.keys() if key not in names]
+    if position > 1:
+        return lambda: order.moveAfter(names, keys[position-2])
+    return lambda: order.moveAfter(names)
+
+
+def moveToPosition(order, names, position):
+    return lambda: order.moveToPosition(names, position)
+
+
+def run(db, func, options):
+    conn = db.open()
+    storage = db.storage
+    random.seed(1)
+
+    objects = size = 0
+    elapsed = 0.0
+    for idx in range(options.moves):
+        order = Reordable(conn.root()['container'])
+        names = random.sample(list(order.keys()), options.block)
+        position = random.randrange(1, options.size - options.block)
+
+        move = func(order, names, position)
+        t0 = time.time()
+        move()
+        elapsed += time.time() - t0
+
+        objects += len(conn._registered_objects)
+        before = storage.getSize()
+        transaction.commit()
+        size += storage.getSize() - before
+
+    conn.close()
+    moves = float(options.moves)
+    return objects / moves, size / moves, elapsed / moves * 1000
+
+
+def main(args=None):
+    parser = optparse.OptionParser()
+    parser.add_option('--size', type='int', default=20000)
+    parser.add_option('--block', type='int', default=3)
+    parser.add_option('--moves', type='int', default=20)
+    options, args = parser.parse_args(args)
+
+    # silence modified events
+    testing.setUp()
+
+    db = DB(MappingStorage())
+    conn = db.open()
+    container = conn.root()['container'] = Container()
+    order = Reordable(container)
+    for idx in xrange(options.size):
+        name = 'item%06d'%idx
+        container.add(name, idx)
+        order.addItem(name)
+    transaction.commit()
+    conn.close()
+
+    print '%16s %10s %12s %10s  (per move of %d items in %d)'%(
+        'operation', 'objects', 'bytes', 'msec', options.block, options.size)
+
+    for title, func in (('updateOrder', drag),
+                        ('moveToPosition', moveToPosition),
+                        ('moveAfter', moveAfter)):
+        print '%16s %10.1f %12.0f %10.2f'%((title,) + run(db, func, options))
+
+    db.close()
+    testing.tearDown()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
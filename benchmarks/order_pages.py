@@ -0,0 +1,70 @@
+##############################################################################
+#
+# Copyright (c) 2009 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+""" deep pages of large container
+
+Cost of page of order by page number, for slice of order btree values
+(previous versions) and for cursor pages.
+
+  python benchmarks/order_pages.py [--size=1000000] [--page=20] [--ops=100]
+
+$Id$
+"""
+import sys, time, optparse
+
+from zojax.content.type.order import AnnotatableOrder
+
+from support import NamesContainer
+
+
+def main(args=None):
+    parser = optparse.OptionParser()
+    parser.add_option('--size', type='int', default=1000000)
+    parser.add_option('--page', type='int', default=20)
+    parser.add_option('--ops', type='int', default=100)
+    options, args = parser.parse_args(args)
+
+    order = AnnotatableOrder(NamesContainer())
+    for idx in xrange(options.size):
+        order.addItem('item%d'%idx)
+
+    size = options.page
+
+    print '%10s %12s %12s  (usec per page of %d in %d items)'%(
+        'page', 'slice', 'cursor', size, options.size)
+
+    for number in (1, 10, 100, 5000, options.size // size):
+        start = (number - 1) * size
+
+        t0 = time.time()
+        for idx in xrange(options.ops):
+            list(order.order.values()[start:start+size])
+        slice = time.time() - t0
+
+        if start:
+            cursor = 'n%x'%order.border[order.keyAtPosition(start)]
+        else:
+            cursor = None
+
+        t0 = time.time()
+        for idx in xrange(options.ops):
+            order.page(cursor, size)
+        cursor = time.time() - t0
+
+        print '%10d %12.1f %12.1f'%(
+            number, slice / options.ops * 1000000,
+            cursor / options.ops * 1000000)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,133 @@
+##############################################################################
+#
+# Copyright (c) 2009 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+""" bytes written by IReordable.updateOrder
+
+Bytes written to storage by one `updateOrder` transaction for
+containers of different size, for full rewrite of order (previous
+versions) and for diff based update.
+
+  python benchmarks/order_reorder.py [--sizes=1000,10000,100000]
+
+$Id$
+"""
+import sys, random, optparse
+
+import transaction
+from ZODB import DB
+from ZODB.MappingStorage import MappingStorage
+
+from zope.component import testing
+
+from zojax.content.type.order import Reordable
+
+from support import Container
+
+
+class RewriteOrder(Reordable):
+    """ updateOrder of previous versions, rewrites whole order """
+
+    def updateOrder(self, order):
+        self.order.clear()
+        self.border.clear()
+
+        spacing = self.KEY_SPACING
+        for idx in range(len(order)):
+            key = (idx + 1) * spacing
+            self.order[key] = order[idx]
+            self.border[order[idx]] = key
+        self.positions.load(self.order.keys())
+
+
+def dragOne(names):
+    name = names.pop(random.randrange(len(names)))
+    names.insert(random.randrange(len(names)), name)
+    return names
+
+
+def swapTwo(names):
+    idx1, idx2 = random.sample(range(len(names)), 2)
+    names[idx1], names[idx2] = names[idx2], names[idx1]
+    return names
+
+
+def shuffleBlock(names):
+    size = max(len(names) // 100, 2)
+    start = random.randrange(len(names) - size)
+    block = names[start:start+size]
+    random.shuffle(block)
+    names[start:start+size] = block
+    return names
+
+
+def reverse(names):
+    names.reverse()
+    return names
+
+
+def written(db, factory, change):
+    conn = db.open()
+    order = factory(conn.root()['container'])
+
+    names = change(list(order.keys()))
+    before = db.storage.getSize()
+    order.updateOrder(names)
+    transaction.commit()
+    size = db.storage.getSize() - before
+
+    conn.close()
+    return size
+
+
+def main(args=None):
+    parser = optparse.OptionParser()
+    parser.add_option('--sizes', default='1000,10000,100000')
+    options, args = parser.parse_args(args)
+
+    # silence modified events
+    testing.setUp()
+
+    changes = (('drag one', dragOne),
+               ('swap two', swapTwo),
+               ('shuffle 1%', shuffleBlock),
+               ('reverse', reverse))
+
+    print '%10s %12s %14s %14s  (bytes written per updateOrder)'%(
+        'items', 'change', 'rewrite', 'diff')
+
+    for size in [int(s) for s in options.sizes.split(',')]:
+        db = DB(MappingStorage())
+        conn = db.open()
+        container = conn.root()['container'] = Container()
+        order = Reordable(container)
+        for idx in xrange(size):
+            name = 'item%06d'%idx
+            container.add(name, idx)
+            order.addItem(name)
+        transaction.commit()
+        conn.close()
+
+        for title, change in changes:
+            random.seed(1)
+            rewrite = written(db, RewriteOrder, change)
+            random.seed(1)
+            diff = written(db, Reordable, change)
+            print '%10d %12s %14d %14d'%(size, title, rewrite, diff)
+
+        db.close()
+
+    testing.tearDown()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
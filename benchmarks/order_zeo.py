@@ -0,0 +1,131 @@
+##############################################################################
+#
+# Copyright (c) 2009 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+""" ZEO round trips per page of ordered container
+
+Starts local ZEO server, reads pages of container with cold client
+cache and counts loads that had to wait for server, with and without
+`AnnotatableOrder.PREFETCH`.
+
+  python benchmarks/order_zeo.py [--size=5000] [--page=50] [--pages=20]
+
+$Id$
+"""
+import os, sys, time, shutil, tempfile, optparse
+
+import ZEO
+import transaction
+from persistent import Persistent
+
+from zojax.content.type.order import AnnotatableOrder
+
+from support import Container
+
+
+class Item(Persistent):
+
+    def __init__(self, title):
+        self.title = title
+
+
+class Counter(object):
+    """ counts blocking loads and prefetch requests of client storage """
+
+    def __init__(self, storage):
+        self.loads = self.prefetches = 0
+
+        server = storage._server
+        load_before = server.load_before
+        prefetch = server.prefetch
+
+        def countLoad(*args):
+            self.loads += 1
+            return load_before(*args)
+
+        def countPrefetch(*args):
+            self.prefetches += 1
+            return prefetch(*args)
+
+        server.load_before = countLoad
+        server.prefetch = countPrefetch
+
+
+def populate(addr, size):
+    db = ZEO.DB(addr)
+    conn = db.open()
+    container = conn.root()['container'] = Container()
+    order = AnnotatableOrder(container)
+    for idx in xrange(size):
+        name = 'item%06d'%idx
+        container.add(name, Item(name))
+        order.addItem(name)
+        if not idx % 1000:
+            transaction.commit()
+    transaction.commit()
+    conn.close()
+    db.close()
+
+
+def run(addr, prefetch, options):
+    db = ZEO.DB(addr)
+    counter = Counter(db.storage)
+    conn = db.open()
+
+    order = AnnotatableOrder(conn.root()['container'])
+    order.PREFETCH = prefetch
+
+    # load order trees, so only items are counted
+    list(order.keys())
+    counter.loads = 0
+
+    t0 = time.time()
+    cursor = None
+    for idx in range(options.pages):
+        items, cursor, previous = order.page(cursor, options.page)
+        for item in items:
+            item.title
+    elapsed = time.time() - t0
+
+    conn.close()
+    db.close()
+
+    pages = float(options.pages)
+    return counter.loads / pages, counter.prefetches / pages, \
+        elapsed / pages * 1000
+
+
+def main(args=None):
+    parser = optparse.OptionParser()
+    parser.add_option('--size', type='int', default=5000)
+    parser.add_option('--page', type='int', default=50)
+    parser.add_option('--pages', type='int', default=20)
+    options, args = parser.parse_args(args)
+
+    tmp = tempfile.mkdtemp()
+    addr, stop = ZEO.server(os.path.join(tmp, 'Data.fs'))
+    try:
+        populate(addr, options.size)
+
+        print '%10s %14s %14s %10s  (per page of %d items)'%(
+            'prefetch', 'waited loads', 'prefetches', 'msec', options.page)
+
+        for prefetch in (False, True):
+            print '%10s %14.1f %14.1f %10.2f'%(
+                (prefetch,) + run(addr, prefetch, options))
+    finally:
+        stop()
+        shutil.rmtree(tmp)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,63 @@
+##############################################################################
+#
+# Copyright (c) 2009 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+""" shared fixtures of benchmarks
+
+$Id$
+"""
+from persistent import Persistent
+from BTrees.Length import Length
+from BTrees.OOBTree import OOBTree
+
+from zope.annotation.interfaces import IAnnotations
+
+
+class Container(Persistent):
+    """ minimal persistent container with annotations """
+
+    def __init__(self):
+        self.data = OOBTree()
+        self.length = Length()
+        self.annotations = OOBTree()
+
+    def add(self, name, item):
+        self.data[name] = item
+        self.length.change(1)
+
+    __setitem__ = add
+
+    def __conform__(self, iface):
+        if iface is IAnnotations:
+            return self.annotations
+
+    def __getitem__(self, name):
+        return self.data[name]
+
+    def __contains__(self, name):
+        return name in self.data
+
+    has_key = __contains__
+
+    def __len__(self):
+        return self.length()
+
+    def keys(self, key=None):
+        return self.data.keys(key)
+
+
+class NamesContainer(Container):
+    """ container without items for benchmarks of order alone,
+    item of name is name """
+
+    def __getitem__(self, name):
+        return name
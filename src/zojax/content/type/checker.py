@@ -15,22 +15,100 @@
 
 $Id$
 """
+from weakref import WeakKeyDictionary
 
 from zope import interface, component
+from zope.proxy import removeAllProxies
 from zope.security import checkPermission
+from zope.security.management import queryInteraction
 
 from interfaces import IContentTypeChecker
 from interfaces import IContentType, IContentContainer
 
+# interaction -> {(cache key, id(container), checker name): (container, res)}
+_cache = WeakKeyDictionary()
+
+
+class ContentTypesChecker(object):
+    """ run content type checkers for many content types in one container,
+    checker lookups and results of cacheable checkers are shared,
+    for current interaction or for this checker if there is no interaction.
+    Cacheable checker can define `cacheKey`, content type name is used
+    by default. """
+
+    def __init__(self, context):
+        self.context = context
+        self.container = removeAllProxies(context)
+        self.spec = interface.providedBy(context)
+        self.lookupAll = component.getSiteManager().adapters.lookupAll
+
+        cache = None
+        interaction = queryInteraction()
+        if interaction is not None:
+            cache = _cache.get(interaction)
+            if cache is None:
+                cache = _cache[interaction] = {}
+        else:
+            cache = {}
+        self.cache = cache
+
+    def __call__(self, contenttype):
+        context = self.context
+        container = self.container
+        cache = self.cache
+
+        for name, factory in self.lookupAll(
+            (interface.providedBy(contenttype), self.spec),
+            IContentTypeChecker):
+
+            checker = factory(contenttype, context)
+            if checker is None:
+                continue
+
+            if getattr(checker, 'cacheable', False):
+                key = (getattr(checker, 'cacheKey', contenttype.name),
+                       id(container), name)
+                entry = cache.get(key)
+                if entry is not None and entry[0] is container:
+                    result = entry[1]
+                else:
+                    result = checker.check()
+                    cache[key] = (container, result)
+            else:
+                result = checker.check()
+
+            if not result:
+                return False
+
+        return True
+
+
+def checkContentType(contenttype, context):
+    """ run all content type checkers """
+    return ContentTypesChecker(context)(contenttype)
+
+
+def invalidateCache():
+    """ drop cached checker results for current interaction """
+    interaction = queryInteraction()
+    if interaction is not None:
+        _cache.pop(interaction, None)
+
 
 class PermissionChecker(object):
     interface.implements(IContentTypeChecker)
     component.adapts(IContentType, IContentContainer)
 
+    cacheable = True
+
     def __init__(self, contenttype, context):
         self.contenttype = contenttype
         self.context = context
 
+    @property
+    def cacheKey(self):
+        return self.contenttype.permission
+
     def check(self):
         contenttype = self.contenttype
         if contenttype.permission:
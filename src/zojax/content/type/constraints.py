@@ -15,8 +15,11 @@
 
 $Id$
 """
+from weakref import WeakKeyDictionary
+
 from zope import interface, component
-from zope.component import queryUtility
+from zope.component import queryUtility, getUtilitiesFor
+from zope.component.interfaces import IRegistrationEvent
 from zope.app.container.constraints import \
     IItemTypePrecondition, IContainerTypesConstraint
 from zope.app.container.interfaces import \
@@ -24,7 +27,10 @@ from zope.app.container.interfaces import \
 
 from interfaces import IContent
 from interfaces import IContentType, IContentContainer
-from interfaces import IExplicitlyAddable
+from interfaces import IActiveType, IExplicitlyAddable
+
+# site manager -> {container type name: (content type, ...)}
+_containment = WeakKeyDictionary()
 
 
 def checkObject(container, name, object):
@@ -136,3 +142,99 @@ def containers(context):
     contenttype = IContentType(context, None)
     if contenttype is not None:
         return queryUtility(IContainerTypesConstraint, contenttype.name)
+
+
+def compileContainedTypes(contenttype):
+    """ ordered candidate child types for container content type,
+    explicitly addable and container constraints already applied """
+    precondition = IItemTypePrecondition(contenttype, None)
+    if precondition is None:
+        return ()
+
+    seen = set()
+    contenttypes = []
+    for tp in precondition.types:
+        ct = queryUtility(IContentType, tp)
+        if ct is not None and ct not in seen:
+            seen.add(ct)
+            contenttypes.append(ct)
+
+    for tp in precondition.ifaces:
+        for name, ct in getUtilitiesFor(tp):
+            if ct not in seen:
+                seen.add(ct)
+                contenttypes.append(ct)
+
+    result = []
+    for ct in contenttypes:
+        if IExplicitlyAddable.providedBy(ct):
+            explicit = ct.name in precondition.types
+            if not explicit:
+                for tp in precondition.ifaces:
+                    if tp not in (IActiveType, IExplicitlyAddable) \
+                            and tp.providedBy(ct):
+                        explicit = True
+                        break
+            if not explicit:
+                continue
+
+        # check the container constraint
+        validate = queryUtility(IContainerTypesConstraint, ct.name)
+        if validate is not None:
+            try:
+                validate(contenttype)
+            except InvalidContainerType:
+                continue
+
+        result.append(ct)
+
+    return tuple(result)
+
+
+def containedTypes(contenttype):
+    """ precompiled candidate child types for container content type """
+    sm = component.getSiteManager()
+
+    graph = _containment.get(sm)
+    if graph is None:
+        graph = _containment[sm] = {}
+
+    name = contenttype.name
+    types = graph.get(name)
+    if types is None:
+        types = graph[name] = compileContainedTypes(contenttype)
+    return types
+
+
+def buildContainment():
+    """ compile containment graph for all registered content types """
+    sm = component.getSiteManager()
+    if sm in _containment:
+        return
+
+    graph = {}
+    for name, ct in sm.getUtilitiesFor(IContentType):
+        graph[ct.name] = compileContainedTypes(ct)
+
+    _containment[sm] = graph
+
+
+def invalidateContainment():
+    _containment.clear()
+
+
+@component.adapter(IRegistrationEvent)
+def registrationChanged(event):
+    registration = event.object
+    if getattr(registration, 'provided', None) in (
+        IItemTypePrecondition, IContainerTypesConstraint) or \
+        IContentType.providedBy(getattr(registration, 'component', None)):
+        invalidateContainment()
+
+
+try:
+    from zope.testing.cleanup import addCleanUp
+except ImportError:
+    pass
+else:
+    addCleanUp(invalidateContainment)
@@ -16,20 +16,28 @@
 
 $Id$
 """
-import re, string
+from BTrees.Length import Length
+from BTrees.OOBTree import OOBTree
+
 from zope import interface, component
+from zope.proxy import removeAllProxies
+from zope.annotation.interfaces import IAnnotations
 from zope.component import queryUtility, queryMultiAdapter
 from zope.security.interfaces import Unauthorized
 from zope.security.management import queryInteraction
 from zope.dublincore.interfaces import IDCDescriptiveProperties
 from zope.app.container.btree import BTreeContainer
+from zope.app.container.contained import uncontained
 from zope.app.container.contained import NameChooser as BaseNameChooser
 from zope.app.container.interfaces import INameChooser
 
+import slug
 from item import Item
+from shards import ShardedTree
 from interfaces import IItem, IContent, IContentContainer
 from interfaces import IReservedNames, NameReserved
 from interfaces import ITitleBasedName, INameChooserConfiglet
+from interfaces import ISlugTransliterator
 
 
 class BaseContentContainer(BTreeContainer):
@@ -43,7 +51,121 @@ class ContentContainer(Item, BaseContentContainer):
     pass
 
 
-class NameChooser(BaseNameChooser):
+class BaseShardedContentContainer(BaseContentContainer):
+    """ content container for millions of items, items are stored
+    in `SHARDS` btrees, each with own length counter """
+
+    SHARDS = 64
+
+    def _newContainerData(self):
+        return ShardedTree(self.SHARDS)
+
+    def __len__(self):
+        return len(self._SampleContainer__data)
+
+    def _setitemf(self, key, value):
+        self._SampleContainer__data[key] = value
+
+    def __delitem__(self, key):
+        data = self._SampleContainer__data
+        item = data[key]
+        del data[key]
+        uncontained(item, self, key)
+
+
+class ShardedContentContainer(Item, BaseShardedContentContainer):
+    pass
+
+
+class SuffixNameChooser(BaseNameChooser):
+    """ keeps highest suffix used for each name, so next free name
+    is found with few container lookups, names are not reserved,
+    concurrent transactions can choose same name and conflict on add """
+
+    ANNOTATION_KEY = 'zojax.content-namesuffixes'
+
+    def chooseName(self, name, object):
+        container = self.context
+
+        if isinstance(name, str):
+            name = name.decode('ascii')
+        if not isinstance(name, unicode):
+            try:
+                name = unicode(name)
+            except Exception:
+                name = u''
+        name = name.replace('/', '-').lstrip('+@')
+
+        if not name:
+            name = unicode(object.__class__.__name__)
+
+        dot = name.rfind('.')
+        if dot >= 0:
+            suffix = name[dot:]
+            name = name[:dot]
+        else:
+            suffix = u''
+
+        n = name + suffix
+        if n in container:
+            n = self.allocateName(name, suffix)
+
+        self.checkName(n, object)
+        return n
+
+    def allocateName(self, name, suffix):
+        container = self.context
+
+        def taken(idx):
+            return u'%s-%d%s'%(name, idx, suffix) in container
+
+        index = self.suffixIndex()
+        counter = None
+        if index is not None:
+            counter = index.get(name + suffix)
+
+        # `last` is used or allocated suffix, look for free one
+        # after it, doubling step, then bisect to first free
+        last = 1
+        if counter is not None:
+            last = max(counter(), 1)
+
+        step = 1
+        free = last + 1
+        while taken(free):
+            last = free
+            step = step * 2
+            free = last + step
+
+        while free - last > 1:
+            middle = (last + free) // 2
+            if taken(middle):
+                last = middle
+            else:
+                free = middle
+
+        if counter is not None:
+            # Length merges concurrent changes
+            counter.change(free - counter())
+        elif index is not None:
+            # first allocation of name, concurrent inserts conflict
+            index[name + suffix] = Length(free)
+
+        return u'%s-%d%s'%(name, free, suffix)
+
+    def suffixIndex(self):
+        annotations = IAnnotations(removeAllProxies(self.context), None)
+        if annotations is None:
+            return None
+
+        index = annotations.get(self.ANNOTATION_KEY)
+        if index is None:
+            index = OOBTree()
+            annotations[self.ANNOTATION_KEY] = index
+        return index
+
+
+class NameChooser(SuffixNameChooser):
     component.adapts(IContentContainer)
 
     def chooseName(self, name, object):
@@ -55,13 +177,17 @@ class NameChooser(BaseNameChooser):
     def checkName(self, name, object):
         names = IReservedNames(self.context, None)
         if names is not None:
-            if name in names.names:
+            isReserved = getattr(names, 'isReserved', None)
+            if isReserved is not None:
+                if isReserved(name):
+                    raise NameReserved(name)
+            elif name in names.names:
                 raise NameReserved(name)
 
         return super(NameChooser, self).checkName(name, object)
 
 
-class TitleBasedNameChooser(BaseNameChooser):
+class TitleBasedNameChooser(SuffixNameChooser):
     component.adapts(IContentContainer, ITitleBasedName)
 
     def __init__(self, container, content):
@@ -74,17 +200,22 @@ class TitleBasedNameChooser(BaseNameChooser):
             if dc is None:
                 dc = IItem(object, None)
             if dc is not None:
-                name = self.getName(dc.title)
+                name = self.getName(dc.title, configlet)
         return super(TitleBasedNameChooser, self).chooseName(name, object)
 
     @staticmethod
-    def getName(title):
-        configlet = queryUtility(INameChooserConfiglet)
-        name = string.strip(
-                    re.sub(
-                        r'-{2,}', '-',
-                        re.sub(re.compile('^\w-|-\w-|-\w$', flags=re.UNICODE), '-',
-                        re.sub(re.compile(r'\W', flags=re.UNICODE), '-', string.strip(title)))), '-').lower()
-        if configlet.limit_words:
-            name = '-'.join(name.split('-')[0:configlet.limit_words])
-        return name
+    def getName(title, configlet=None):
+        if configlet is None:
+            configlet = queryUtility(INameChooserConfiglet)
+        return slug.engine.slug(
+            title, getattr(configlet, 'limit_words', 0),
+            queryUtility(ISlugTransliterator))
+
+    @staticmethod
+    def getNames(titles, configlet=None):
+        """ names for many titles, for importers """
+        if configlet is None:
+            configlet = queryUtility(INameChooserConfiglet)
+        return slug.engine.slugs(
+            titles, getattr(configlet, 'limit_words', 0),
+            queryUtility(ISlugTransliterator))
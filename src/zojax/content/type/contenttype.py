@@ -16,29 +16,31 @@
 $Id$
 """
 import types
+from weakref import WeakKeyDictionary
 
 from zope import interface, event
-from zope.component import getAdapters, queryUtility, getUtilitiesFor
 
+from zope.schema import Field, getFields
 from zope.location import Location
 from zope.proxy import removeAllProxies
 from zope.lifecycleevent import ObjectCreatedEvent
 from zope.security.interfaces import Unauthorized
+from zope.security.checker import selectChecker
 from zope.security.proxy import removeSecurityProxy
 
-from zope.app.container.constraints import \
-     IItemTypePrecondition, IContainerTypesConstraint
+from zope.app.container.contained import \
+     containedEvent, notifyContainerModified
 from zope.app.container.interfaces import \
      IAdding, INameChooser, IContainerNamesContainer
-from zope.app.container.interfaces import InvalidItemType, InvalidContainerType
 
 from interfaces import _
 from interfaces import IContentType, IBoundContentType
-from interfaces import IContentContainer, IContentTypeChecker
-from interfaces import IActiveType, IInactiveType, IExplicitlyAddable
+from interfaces import IContentContainer
+from interfaces import IInactiveType
 from interfaces import IContentNamesContainer
 
-from constraints import checkObject
+from checker import checkContentType, ContentTypesChecker
+from constraints import checkObject, containedTypes
 
 
 class ContentType(Location):
@@ -60,31 +62,18 @@ class ContentType(Location):
         self.permission = permission
         self.addform = addform
 
-        # args,kwargs for klass constructor
-        if klass is None or type(klass.__init__) != types.MethodType:
-            self.factoryArgs = ()
-            self.factoryNames = ()
-            return
-
-        func = klass.__init__.im_func
-        code = func.func_code
-        names = code.co_varnames[1:code.co_argcount]
-
-        if not func.func_defaults:
-            self.factoryArgs = names
-            self.factoryNames = ()
-        else:
-            num = len(names)- len(func.func_defaults)
-            self.factoryArgs = names[:num]
-            self.factoryNames = names[num:]
+        # args,kwargs for klass constructor and schema fields setters
+        self.plan = CreationPlan(klass, schema)
+        self.factoryArgs = self.plan.factoryArgs
+        self.factoryNames = self.plan.factoryNames
 
     def __bind__(self, context):
-        clone = self.__class__.__new__(self.__class__)
-        clone.__dict__.update(self.__dict__)
-        clone.context = context
-        if context is not None:
-            interface.alsoProvides(clone, IBoundContentType)
-        return clone
+        if context is None:
+            clone = self.__class__.__new__(self.__class__)
+            clone.__dict__.update(self.__dict__)
+            return clone
+
+        return boundClass(self.__class__)(self, context)
 
     def __str__(self):
         if IBoundContentType.providedBy(self):
@@ -127,116 +116,339 @@ class ContentType(Location):
         else:
             raise ValueError(_("Can't add content."))
 
+    def addMany(self, contents, coalesce=False):
+        if not self.isAddable():
+            raise Unauthorized("Can't create '%s' instance"%self.name)
+
+        context = self.container
+        container = removeSecurityProxy(context)
+
+        isContentContainer = IContentContainer.providedBy(context)
+        isNamesContainer = IContainerNamesContainer.providedBy(context)
+        customCheck = self.__class__.checkObject.im_func is not \
+            ContentType.checkObject.im_func
+
+        setitem = None
+        if coalesce:
+            setitem = getattr(container, '_setitemf', None)
+
+        chooser = None
+        checked = set()
+        modified = False
+
+        try:
+            for content in contents:
+                name = ''
+                if type(content) is types.TupleType:
+                    name, content = content
+
+                if type(content) is types.DictType:
+                    content = self.create(**content)
+
+                content = removeAllProxies(content)
+
+                if not (isContentContainer or
+                        IContentNamesContainer.providedBy(content)):
+                    raise ValueError(_("Can't add content."))
+
+                if chooser is None:
+                    chooser = INameChooser(context)
+
+                if isNamesContainer:
+                    name = chooser.chooseName('', content)
+                else:
+                    name = chooser.chooseName(name, content)
+                    chooser.checkName(name, content)
+
+                # constraints depend on content type only
+                spec = interface.providedBy(content)
+                if customCheck or spec not in checked:
+                    self.checkObject(context, name, content)
+                    checked.add(spec)
+
+                if setitem is None:
+                    container[name] = content
+                else:
+                    # name checks of zope `setitem`
+                    if isinstance(name, str):
+                        try:
+                            name = unicode(name)
+                        except UnicodeError:
+                            raise TypeError(
+                                "name not unicode or ascii string")
+                    elif not isinstance(name, unicode):
+                        raise TypeError("name not unicode or ascii string")
+                    if not name:
+                        raise ValueError("empty names are not allowed")
+
+                    old = container.get(name)
+                    if old is content:
+                        yield context[name]
+                        continue
+                    if old is not None:
+                        raise KeyError(name)
+
+                    content, ev = containedEvent(content, container, name)
+                    setitem(name, content)
+                    if ev is not None:
+                        event.notify(ev)
+                    modified = True
+
+                yield context[name]
+        finally:
+            if modified:
+                notifyContainerModified(container)
+
     def create(self, *args, **data):
         if self.klass is None:
             raise ValueError("Can't create content type: '%s'"%self.name)
 
-        # prepare arguments
-        args = list(args)
-        for name in self.factoryArgs[len(args):]:
+        plan = self.plan
+        if plan.klass is not self.klass or plan.schema is not self.schema:
+            plan = CreationPlan(self.klass, self.schema)
+
+        content = plan(args, data)
+
+        event.notify(ObjectCreatedEvent(content))
+        return content
+
+    def createMany(self, data, validate=False):
+        if not validate:
+            for item in data:
+                yield self.create(**item)
+            return
+
+        if self.klass is None:
+            raise ValueError("Can't create content type: '%s'"%self.name)
+
+        plan = self.plan
+        if plan.klass is not self.klass or plan.schema is not self.schema:
+            plan = CreationPlan(self.klass, self.schema)
+
+        for item in data:
+            content = plan((), item, True)
+            event.notify(ObjectCreatedEvent(content))
+            yield content
+
+    def isAddable(self):
+        return self.isAvailable()
+
+    def isAvailable(self):
+        if not IBoundContentType.providedBy(self) or \
+                IInactiveType.providedBy(self):
+            return False
+
+        return checkContentType(self, self.context)
+
+    def listContainedTypes(self, checkAvailability=True):
+        if IBoundContentType.providedBy(self):
+            context = self.context
+            if not IContentContainer.providedBy(context):
+                return
+
+            contenttypes = [
+                contenttype.__bind__(context)
+                for contenttype in containedTypes(self)]
+
+            if checkAvailability:
+                contenttypes = filterAvailable(contenttypes, context)
+
+            for contenttype in contenttypes:
+                yield contenttype
+
+
+def filterAvailable(contenttypes, context):
+    """ filter bound content types available in context,
+    checkers lookups and results are shared between content types """
+    check = ContentTypesChecker(context)
+    isAvailable = ContentType.isAvailable.im_func
+
+    for contenttype in contenttypes:
+        if contenttype.__class__.isAvailable.im_func is not isAvailable:
+            if contenttype.isAvailable():
+                yield contenttype
+        elif not IInactiveType.providedBy(contenttype) and check(contenttype):
+            yield contenttype
+
+
+def availableTypes(context, names=None):
+    """ list content types that can be added to context,
+    limited to content type names if names is not None """
+    if not IContentContainer.providedBy(context):
+        return []
+
+    contenttype = IContentType(context, None)
+    if contenttype is None:
+        return []
+
+    if contenttype.__class__.listContainedTypes.im_func is not \
+            ContentType.listContainedTypes.im_func:
+        # custom content type implementation
+        contenttypes = list(contenttype.listContainedTypes())
+        if names is not None:
+            names = set(names)
+            contenttypes = [ct for ct in contenttypes if ct.name in names]
+        return contenttypes
+
+    contenttypes = containedTypes(contenttype)
+    if names is not None:
+        index = dict((ct.name, ct) for ct in contenttypes)
+        contenttypes = []
+        for name in names:
+            ct = index.pop(name, None)
+            if ct is not None:
+                contenttypes.append(ct)
+
+    return list(filterAvailable(
+            [ct.__bind__(context) for ct in contenttypes], context))
+
+
+class CreationPlan(object):
+    """ compiled content creation: constructor arguments
+    and schema fields setters """
+
+    def __init__(self, klass, schema):
+        self.klass = klass
+        self.schema = schema
+
+        # args,kwargs for klass constructor
+        if klass is None or type(klass.__init__) != types.MethodType:
+            self.factoryArgs = ()
+            self.factoryNames = ()
+        else:
+            func = klass.__init__.im_func
+            code = func.func_code
+            names = code.co_varnames[1:code.co_argcount]
+
+            if not func.func_defaults:
+                self.factoryArgs = names
+                self.factoryNames = ()
+            else:
+                num = len(names)- len(func.func_defaults)
+                self.factoryArgs = names[:num]
+                self.factoryNames = names[num:]
+
+        self.fields = fields = {}
+        if schema is not None:
+            fields.update(getFields(schema))
+
+        # name -> (field, set attribute directly)
+        self.setters = setters = {}
+        constructor = self.factoryArgs + self.factoryNames
+        for name, field in fields.items():
+            if name not in constructor:
+                setters[name] = (
+                    field, not field.readonly and
+                    field.__class__.set.im_func is Field.set.im_func)
+
+    def __call__(self, args, data, validate=False):
+        nargs = len(args)
+        kwargs = {}
+
+        for name in self.factoryArgs[nargs:]:
             if name not in data:
                 raise TypeError('Not enough arguments')
+            kwargs[name] = data[name]
 
-        kwargs = {}
-        for name in self.factoryNames:
+        for name in self.factoryNames[max(nargs-len(self.factoryArgs), 0):]:
             if name in data:
                 kwargs[name] = data[name]
 
+        if validate:
+            fields = self.fields
+            for name, value in kwargs.items():
+                if name in fields:
+                    fields[name].validate(value)
+
         # create content
         content = self.klass(*args, **kwargs)
 
         # set content attributes
-        schema = self.schema
-        args = self.factoryArgs
-        names = self.factoryNames
+        setters = self.setters
         for name, value in data.items():
-            if name not in args and name not in names:
-                if name in self.schema:
-                    field = schema[name].bind(content)
+            if name in setters:
+                field, fast = setters[name]
+                if validate:
+                    field = field.bind(content)
+                    field.validate(value)
                     field.set(content, value)
+                elif fast:
+                    setattr(content, name, value)
+                else:
+                    field.bind(content).set(content, value)
 
-        event.notify(ObjectCreatedEvent(content))
         return content
 
-    def isAddable(self):
-        if not IBoundContentType.providedBy(self) or \
-                IInactiveType.providedBy(self):
-            return False
 
-        for name, adapter in getAdapters(
-            (self, self.context), IContentTypeChecker):
-            if not adapter.check():
-                return False
-        else:
-            return True
+class BoundContentType(object):
+    """ content type bound to context, shares data of unbound content type,
+    class of bound content type is subclass of content type class, see
+    `boundClass`, interfaces of unbound content type are taken on bind """
+    interface.implements(IBoundContentType)
+
+    __slots__ = ('__contenttype__', '__provided__',
+                 'context', '__parent__', '__name__')
+
+    def __init__(self, contenttype, context):
+        setattr = object.__setattr__
+        setattr(self, '__dict__', contenttype.__dict__)
+        setattr(self, '__contenttype__', contenttype)
+        setattr(self, '__provided__', interface.providedBy(contenttype))
+        setattr(self, '__parent__', contenttype.__parent__)
+        setattr(self, '__name__', contenttype.__name__)
+        setattr(self, 'context', context)
+
+    def __setattr__(self, name, value):
+        if name not in _boundSlots and \
+                self.__dict__ is self.__contenttype__.__dict__:
+            # data is shared with unbound content type, copy on first change
+            object.__setattr__(self, '__dict__', dict(self.__dict__))
+        object.__setattr__(self, name, value)
+
+    def __delattr__(self, name):
+        if name not in _boundSlots and \
+                self.__dict__ is self.__contenttype__.__dict__:
+            object.__setattr__(self, '__dict__', dict(self.__dict__))
+        object.__delattr__(self, name)
 
-    def isAvailable(self):
-        if not IBoundContentType.providedBy(self) or \
-                IInactiveType.providedBy(self):
-            return False
+    def __bind__(self, context):
+        return self.__contenttype__.__bind__(context)
 
-        for name, adapter in getAdapters(
-            (self, self.context), IContentTypeChecker):
-            if not adapter.check():
-                return False
-        else:
-            return True
+    def __str__(self):
+        cls = self.__contenttype__.__class__
+        return "<BoundContentType:%s.%s %s '%s'>"%(
+            cls.__module__, cls.__name__, self.name, self.title)
+
+    @property
+    def __providedBy__(self):
+        provides = self.__provided__
+
+        spec = _boundSpecs.get(provides)
+        if spec is None:
+            spec = _boundSpecs[provides] = interface.declarations.Provides(
+                BoundContentType, provides)
+        return spec
+
+    @property
+    def __Security_checker__(self):
+        return selectChecker(self.__contenttype__)
+
+
+_boundSlots = frozenset(BoundContentType.__slots__)
+
+# provided spec of unbound content type -> spec of bound content type
+_boundSpecs = WeakKeyDictionary()
+
+# content type class -> class of bound content type
+_boundClasses = {}
 
-    def listContainedTypes(self, checkAvailability=True):
-        if IBoundContentType.providedBy(self):
-            context = self.context
-            if not IContentContainer.providedBy(context):
-                return
 
-            precondition = IItemTypePrecondition(self, None)
-
-            if precondition is not None:
-                contenttypes = []
-                for tp in precondition.types:
-                    ct = queryUtility(IContentType, tp)
-                    if ct is not None and ct not in contenttypes:
-                        contenttypes.append(ct)
-
-                for tp in precondition.ifaces:
-                    for name, ct in getUtilitiesFor(tp):
-                        if ct not in contenttypes:
-                            contenttypes.append(ct)
-
-                for contenttype in contenttypes:
-                    contenttype = contenttype.__bind__(context)
-
-                    explicit = True
-                    if IExplicitlyAddable.providedBy(contenttype):
-                        explicit = False
-                        for tp in precondition.ifaces:
-                            if tp not in (IActiveType, IExplicitlyAddable)\
-                                    and tp.providedBy(contenttype):
-                                explicit = True
-                                break
-
-                        for tp in precondition.types:
-                            if contenttype.name == tp:
-                                explicit = True
-                                break
-
-                    if explicit:
-                        # check the container constraint
-                        validate = queryUtility(
-                            IContainerTypesConstraint, contenttype.name)
-                        if validate is not None:
-                            try:
-                                validate(self)
-
-                                if not checkAvailability:
-                                    yield contenttype
-
-                                elif contenttype.isAvailable():
-                                    yield contenttype
-                            except InvalidContainerType:
-                                pass
-                        else:
-                            if not checkAvailability:
-                                yield contenttype
-
-                            elif contenttype.isAvailable():
-                                yield contenttype
+def boundClass(klass):
+    """ class of bound content type for content type class """
+    try:
+        return _boundClasses[klass]
+    except KeyError:
+        cls = type(klass.__name__, (BoundContentType, klass),
+                   {'__slots__': (), '__module__': klass.__module__})
+        _boundClasses[klass] = cls
+        return cls
@@ -124,6 +124,11 @@ class IAnnotatableOrder(IOrderAware):
     """ store order information in annotation """
 
 
+class IUnorderedContainer(IAnnotatableOrder):
+    """ order is native keys order of container, nothing is stored,
+    overrides annotatable order """
+
+
 class IOrder(interface.Interface):
     """ container contents order """
 
@@ -136,6 +141,25 @@ class IOrder(interface.Interface):
     def rebuild():
         """ rebuild order """
 
+    def iterkeys(start=None, stop=None):
+        """ iterate names in order, from position start to stop (0-based) """
+
+    def itervalues(start=None, stop=None):
+        """ iterate items in order, items are released to pickle cache
+        by batches """
+
+    def iteritems(start=None, stop=None):
+        """ iterate (name, item) pairs in order, items are released to
+        pickle cache by batches """
+
+    def page(cursor=None, size=20):
+        """Return page of items after (or before) cursor.
+
+        Return tuple (items, next cursor, previous cursor), cursors are
+        opaque strings, cursor is None if there is no next or previous
+        page. Cost of page doesn't depend on page number.
+        """
+
     def nextKey(key=None):
         """Return the next key.
 
@@ -152,26 +176,42 @@ class IOrder(interface.Interface):
         no such key exists.
         """
         
+    def neighbours(key, before=1, after=1):
+        """Return tuple of lists of `before` keys before and `after` keys
+        after key. Lists are shorter at the ends of order.
+        """
+
     def keyPosition(key=None):
         """Return the key position.
 
-        If a key argument if provided and not None, return the key position in order.
-        Raise an exception if
+        If a key argument if provided and not None, return the key position
+        in order, first item has position 1. Raise an exception if
         no such key exists.
         """
-        
+
+    def keyAtPosition(position):
+        """Return the key at position, first item has position 1.
+
+        Raise KeyError if no such position exists.
+        """
+
     def getByPosition(position=None):
         """Get item by  key position.
 
         If a key argument if provided and not None, return the item by position.
-        Raise an exception if
-        no such key exists.
+        Raise KeyError if
+        no such position exists.
         """
 
 
 class IReordable(interface.Interface):
     """ reordable contents """
 
+    notifications = interface.Attribute(
+        "Events for moved items: 'swap' (default) - modified event for each "
+        "swapped item, 'items' - one modified event for each moved item, "
+        "'container' - one container modified event for operation")
+
     def moveUp(names):
         """ move items up """
 
@@ -184,10 +224,65 @@ class IReordable(interface.Interface):
     def moveBottoms(names):
         """ move items bottom """
 
+    def moveAfter(names, anchor=None):
+        """ move items after item `anchor`, to top if anchor is None """
+
+    def moveToPosition(names, position):
+        """ move items, so first item has position `position` """
+
     def updateOrder(order):
         """ update container order """
 
 
+class ITypeIndexedContainer(interface.Interface):
+    """ container keeps index of items by content type """
+
+
+class ITypeIndex(interface.Interface):
+    """ index of container items by content type name,
+    items of type are in name order, not in `IOrder` of container,
+    so moves don't rewrite index """
+
+    pending = interface.Attribute(
+        "Not None while existing items of container are not indexed yet, "
+        "reads return indexed items only, `materialize` indexes the rest")
+
+    def addItem(name, item):
+        """ index item """
+
+    def removeItem(name):
+        """ remove item from index """
+
+    def rebuild():
+        """ index all items of container """
+
+    def materialize(limit=None):
+        """ index `limit` items not indexed yet, return True if index
+        is complete """
+
+    def typeNames():
+        """ names of content types of items """
+
+    def count(typename):
+        """ number of items of type """
+
+    def typeOf(name):
+        """ content type name of item """
+
+    def keys(typename):
+        """ names of items of type """
+
+    def values(typename):
+        """ items of type """
+
+    def iteritems(typename, start=None, stop=None):
+        """ iterate (name, item) pairs of type, items are released to
+        pickle cache by batches """
+
+    def page(typename, cursor=None, size=20):
+        """ page of items of type, see `IOrder.page` """
+
+
 class IReservedNames(interface.Interface):
     """A list of reserved name,
     that can be used as item name in content container """
@@ -197,6 +292,10 @@ class IReservedNames(interface.Interface):
         description = u'Not allowed names as item name',
         required = True)
 
+    def isReserved(name):
+        """ name is reserved name, starts with reserved prefix or
+        matches reserved pattern """
+
 
 class IContentType(interface.Interface):
 
@@ -227,12 +326,27 @@ class IContentType(interface.Interface):
     def add(content, name=''):
         """ add content to container """
 
+    def addMany(contents, coalesce=False):
+        """ add contents to container, return iterator over added contents.
+
+        Item of contents can be content, dict of data for `create` or
+        (name, content or data) tuple. Addability and constraints are checked
+        once per content type. If coalesce is True container modified event
+        is sent once, after all contents are added (objects added events
+        are still sent for each content). Names are chosen for each content
+        by name chooser of container """
+
     def checkObject(container, name, content):
         """ check content in container """
 
     def create(**data):
         """ create content """
 
+    def createMany(data, validate=False):
+        """ create contents from iterable of data dicts,
+        return iterator over created contents. If validate is True
+        data is validated with schema fields """
+
     def isAdable():
         """ addable in context """
 
@@ -250,6 +364,12 @@ class IBoundContentType(interface.Interface):
 class IContentTypeChecker(interface.Interface):
     """ check if content type withing context """
 
+    cacheable = interface.Attribute(
+        'Optional, result of check can be cached for current interaction')
+
+    cacheKey = interface.Attribute(
+        'Optional, key of cached result, content type name by default')
+
     def __init__(contenttype, context):
         """ init """
 
@@ -329,6 +449,13 @@ class ITitleBasedName(interface.Interface):
     """ title based name chooser """
 
 
+class ISlugTransliterator(interface.Interface):
+    """ transliteration of titles for title based names """
+
+    def __call__(title):
+        """ return title with non latin characters transliterated """
+
+
 class INameChooserConfiglet(interface.Interface):
     """ configlet interface """
 
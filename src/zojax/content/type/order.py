@@ -17,9 +17,13 @@ from zope.lifecycleevent import ObjectModifiedEvent
 
 $Id$
 """
-import types
-from BTrees.OIBTree import OIBTree
+import sys, types, random
+from bisect import bisect_left
+from itertools import islice
+from BTrees.Length import Length
 from BTrees.IOBTree import IOBTree
+from BTrees.LOBTree import LOBTree
+from BTrees.OLBTree import OLBTree
 
 from zope import interface, component
 from zope.proxy import removeAllProxies
@@ -28,6 +32,14 @@ from zope.app.container.contained import notifyContainerModified
 from zope.app.container.interfaces import IObjectMovedEvent
 
 from interfaces import IOrder, IReordable, IAnnotatableOrder
+from interfaces import IUnorderedContainer
+from positions import PositionIndex
+
+
+MAXCHAR = unichr(sys.maxunicode)
+
+# keys outside of +-KEY_LIMIT are reported by check
+KEY_LIMIT = 1 << 62
 
 
 class AnnotatableOrder(object):
@@ -35,6 +47,20 @@ class AnnotatableOrder(object):
 
     ANNOTATION_KEY = 'zojax.content-containerorder'
 
+    # items are released to pickle cache by batches in iteritems
+    BATCH_SIZE = 100
+
+    # load ghost items of slice, page or batch in one storage request
+    PREFETCH = False
+
+    # distance between keys of appended items, low bits of key are random,
+    # so concurrent appends use different keys and ZODB can merge them
+    KEY_SPACING = 1 << 16
+
+    # names of unordered tail merged into order by each addItem,
+    # 0 leaves merging to `materialize` calls
+    MERGE_SIZE = 500
+
     def __init__(self, context):
         annotations = IAnnotations(removeAllProxies(context))
 
@@ -43,21 +69,348 @@ class AnnotatableOrder(object):
 
         data = annotations.get(self.ANNOTATION_KEY)
         if data is None:
-            self.rebuild()
+            # existing items are unordered tail, merged by chunks later
+            size = len(context)
+            if size:
+                self.initialize(u'', (size + 1) * self.KEY_SPACING)
+            else:
+                self.initialize()
         else:
-            self.order, self.border = data
-
-    def initialize(self):
-        data = [IOBTree(), OIBTree()]
+            self.order, self.border = data[:2]
+            self.length = self.positions = None
+            self.pending = self.tailEnd = None
+            if len(data) > 2:
+                self.length = data[2]
+            if len(data) > 3:
+                self.positions = data[3]
+            if len(data) > 4:
+                self.pending = data[4]
+            if len(data) > 5:
+                self.tailEnd = data[5]
+
+    def initialize(self, pending=None, tailEnd=None):
+        self.order, self.border = LOBTree(), OLBTree()
+        self.length, self.positions = Length(), PositionIndex()
+        self.pending = pending
+        # keys below `tailEnd` are reserved for unordered tail
+        self.tailEnd = tailEnd
+        self.store()
+
+    def store(self):
+        data = [self.order, self.border, self.length, self.positions]
+        if self.pending is not None:
+            data.append(self.pending)
+            if self.tailEnd is not None:
+                data.append(self.tailEnd)
         self.annotations[self.ANNOTATION_KEY] = data
-        self.order, self.border = data
 
-    def generateKey(self, item):
-        keys = self.order.keys()
-        if keys:
-            return keys[-1] + 1
+    def upgrade(self):
+        # order annotation created by previous versions
+        order = self.order
+        if isinstance(order, IOBTree):
+            self.order, self.border = LOBTree(), OLBTree()
+            for idx, name in enumerate(order.values()):
+                key = (idx + 1) * self.KEY_SPACING
+                self.order[key] = name
+                self.border[name] = key
+            self.length = Length(len(self.order))
+            self.positions = PositionIndex(self.order.keys())
+        elif self.length is None or self.positions is None:
+            if self.length is None:
+                self.length = Length(len(order))
+            if self.positions is None:
+                self.positions = PositionIndex(order.keys())
         else:
-            return 1
+            return
+
+        self.store()
+
+    def unordered(self):
+        """ names of container not merged into order yet """
+        marker = self.pending
+        if marker is None:
+            return
+
+        names = None
+        if marker:
+            # btree containers iterate keys from marker
+            try:
+                names = self.context.keys(marker)
+            except TypeError:
+                pass
+        if names is None:
+            names = self.context.keys()
+
+        border = self.border
+        for name in names:
+            if name not in border:
+                yield name
+
+    def materialize(self, limit=None):
+        """ merge `limit` names of unordered tail into order,
+        return True if order is complete """
+        if self.pending is None:
+            return True
+
+        self.upgrade()
+
+        names = self.unordered()
+        if limit is not None:
+            names = islice(names, limit)
+        names = list(names)
+
+        for name in names:
+            self._setKey(self.generateTailKey(), name)
+        self.length.change(len(names))
+
+        if limit is None or len(names) < limit:
+            self.pending = self.tailEnd = None
+        else:
+            self.pending = names[-1]
+        self.store()
+        return self.pending is None
+
+    def materializeTo(self, names):
+        """ merge unordered tail up to `names` and one name after them,
+        so names and their neighbours are in order """
+        if self.pending is None:
+            return True
+        if self.tailEnd is None:
+            # no keys reserved for tail, order created by previous version
+            return self.materialize()
+
+        border = self.border
+        context = self.context
+        wanted = set([name for name in names if name is not None and
+                      name not in border and context.has_key(name)])
+
+        count = 0
+        if wanted:
+            for name in self.unordered():
+                count += 1
+                wanted.discard(name)
+                if not wanted:
+                    break
+        return self.materialize(count + 1)
+
+    def _setKey(self, key, name):
+        self.order[key] = name
+        self.border[name] = key
+        self.positions.insert(key)
+
+    def _delKey(self, key):
+        del self.order[key]
+        self.positions.remove(key)
+
+    def check(self, limit=None):
+        """ list of (problem, name) tuples, at most `limit` items """
+        problems = []
+
+        def report(problem, name=None):
+            if limit is None or len(problems) < limit:
+                problems.append((problem, name))
+
+        context = self.context
+        order = self.order
+        border = self.border
+
+        if isinstance(order, IOBTree):
+            report('legacy')
+
+        if self.pending is not None:
+            report('pending')
+        else:
+            for name in context.keys():
+                if name not in border:
+                    report('missing', name)
+
+        count = 0
+        for key, name in order.items():
+            count += 1
+            if not context.has_key(name):
+                report('stale', name)
+            elif border.get(name) != key:
+                report('mismatch', name)
+
+        for name, key in border.items():
+            if order.get(key) != name:
+                if context.has_key(name):
+                    report('mismatch', name)
+                else:
+                    report('stale', name)
+
+        if self.length is not None and self.length() != count:
+            report('length')
+        if self.positions is None or len(self.positions) != count:
+            report('positions')
+
+        # keys spread too wide or close to limits of 64bit keys,
+        # adjacent keys are respaced by moves when needed
+        if count and self.pending is None:
+            minKey, maxKey = order.minKey(), order.maxKey()
+            if maxKey - minKey > self.KEY_SPACING * (count + 1) * 16 or \
+                    minKey < -KEY_LIMIT or maxKey > KEY_LIMIT:
+                report('keys')
+        return problems
+
+    def repair(self, compact=True):
+        """ fix order entries and counters, respace keys """
+        self.upgrade()
+        self.materialize()
+
+        context = self.context
+        order = self.order
+        border = self.border
+
+        stale = [key for key, name in order.items()
+                 if not context.has_key(name) or border.get(name) != key]
+        for key in stale:
+            del order[key]
+
+        stale = [name for name, key in border.items()
+                 if order.get(key) != name]
+        for name in stale:
+            del border[name]
+
+        self.length.set(len(order))
+        self.positions.load(order.keys())
+
+        for name in context.keys():
+            if name not in border:
+                self.addItem(name)
+
+        if compact:
+            for count in self.compactKeys():
+                pass
+
+    def compactKeys(self, chunk=1000):
+        """ respace keys to KEY_SPACING steps, generator, yields after each
+        `chunk` moved keys, order is valid between chunks so changes can
+        be committed """
+        order = self.order
+        border = self.border
+        spacing = self.KEY_SPACING
+
+        count = self.length()
+        if not count:
+            return
+        top = (count + 1) * spacing
+
+        moved = 0
+        if order.minKey() <= top:
+            # move order above final range, from last item
+            key = order.maxKey()
+            newKey = max(key, top) + spacing * (count + 1)
+            while key is not None:
+                try:
+                    next = order.maxKey(key-1)
+                except ValueError:
+                    next = None
+
+                name = order[key]
+                self._delKey(key)
+                self._setKey(newKey, name)
+                newKey -= spacing
+                key = next
+
+                moved += 1
+                if not moved % chunk:
+                    yield moved
+
+        # move order to final range, from first item
+        key = order.minKey()
+        newKey = spacing
+        while key is not None:
+            try:
+                next = order.minKey(key+1)
+            except ValueError:
+                next = None
+
+            name = order[key]
+            self._delKey(key)
+            self._setKey(newKey, name)
+            newKey += spacing
+            key = next
+
+            moved += 1
+            if not moved % chunk:
+                yield moved
+
+        yield moved
+
+    def generateKey(self, item):
+        spacing = self.KEY_SPACING
+        try:
+            slot = self.order.maxKey() // spacing + 1
+        except ValueError:
+            slot = 1
+        if self.tailEnd is not None:
+            slot = max(slot, self.tailEnd // spacing)
+        return slot * spacing + random.randrange(spacing)
+
+    def generateTailKey(self):
+        """ key for merged name of unordered tail, tail keys are before
+        keys of items added while order is pending """
+        tailEnd = self.tailEnd
+        if tailEnd is None:
+            return self.generateKey(None)
+
+        spacing = self.KEY_SPACING
+        try:
+            slot = self.order.maxKey(tailEnd - 1) // spacing + 1
+        except ValueError:
+            slot = 1
+        if (slot + 1) * spacing > tailEnd:
+            # more names than reserved keys
+            return self.generateKey(None)
+        return slot * spacing + random.randrange(spacing)
+
+    def allocateKeys(self, key, count):
+        """ return `count` free keys after `key`, None if there is no gap """
+        order = self.order
+        spacing = self.KEY_SPACING
+
+        try:
+            if key is None:
+                next = order.minKey()
+            else:
+                next = order.minKey(key+1)
+        except ValueError:
+            next = None
+
+        if next is None:
+            key = key or 0
+            return [key + spacing*(idx+1) for idx in range(count)]
+
+        if key is None:
+            return [next - spacing*(count-idx) for idx in range(count)]
+
+        step = (next - key) // (count + 1)
+        if step < 1:
+            return None
+        return [key + step*(idx+1) for idx in range(count)]
+
+    def renumber(self, name=None, room=0):
+        """ respace keys, leave room for `room` keys after `name` """
+        order = self.order
+        border = self.border
+        spacing = self.KEY_SPACING
+
+        names = list(order.values())
+        order.clear()
+
+        key = 0
+        if name is None:
+            key = room * spacing
+
+        for item in names:
+            key = key + spacing
+            order[key] = item
+            border[item] = key
+            if item == name:
+                key = key + room * spacing
+
+        self.positions.load(order.keys())
 
     def rebuild(self):
         self.initialize()
@@ -66,30 +419,46 @@ class AnnotatableOrder(object):
             self.addItem(name)
 
     def addItem(self, name):
-        if name in self.order.values():
+        if name in self.border:
             return
 
-        idx = self.generateKey(self.context[name])
-        self.order[idx] = name
-        self.border[name] = idx
+        self.upgrade()
+
+        self._setKey(self.generateKey(self.context[name]), name)
+        self.length.change(1)
+
+        if self.pending is not None and self.MERGE_SIZE:
+            self.materialize(self.MERGE_SIZE)
 
     def removeItem(self, name):
         if name not in self.border:
             return
 
-        idx = self.border[name]
+        self.upgrade()
 
-        del self.order[idx]
+        self._delKey(self.border[name])
         del self.border[name]
+        self.length.change(-1)
 
     def keys(self):
+        if self.pending is not None:
+            order = self.order
+            if self.tailEnd is None:
+                return list(order.values()) + list(self.unordered())
+            return list(order.values(max=self.tailEnd - 1)) + \
+                list(self.unordered()) + \
+                list(order.values(min=self.tailEnd))
         return self.order.values()
 
     def __len__(self):
-        return len(self.order)
+        if self.pending is not None:
+            return len(self.context)
+        if self.length is None:
+            return len(self.order)
+        return self.length()
 
     def __iter__(self):
-        return iter(self.order.values())
+        return iter(self.keys())
 
     def __getitem__(self, key):
         if isinstance(key, types.SliceType):
@@ -97,33 +466,177 @@ class AnnotatableOrder(object):
             context = self.context
 
             start = key.start or 0
-            stop = key.stop or len(context)
-
-            for idx in self.order.values()[start:stop]:
+            stop = key.stop or len(self)
+
+            if self.positions is None or self.pending is not None \
+                    or start < 0 or stop < 0:
+                names = self.keys()[start:stop]
+            elif start >= stop or start >= len(self):
+                names = ()
+            else:
+                names = islice(self.order.values(
+                        self.positions.select(start)), stop - start)
+
+            for idx in names:
                 items.append(context[idx])
+
+            if self.PREFETCH:
+                prefetch(items)
             return items
         else:
             return self.context[key]
 
+    def page(self, cursor=None, size=20):
+        order = self.order
+
+        if cursor is None:
+            direction, key = 'n', None
+        else:
+            direction = cursor[:1]
+            try:
+                key = int(cursor[1:], 16)
+            except ValueError:
+                direction = None
+            if direction not in ('n', 'p', 'N', 'P'):
+                raise ValueError('Invalid cursor: %r'%cursor)
+
+        if self.pending is not None or direction in ('N', 'P'):
+            return self._positionPage(cursor, direction, key, size)
+
+        if direction == 'n':
+            if key is None:
+                keys = order.keys()
+            else:
+                keys = order.keys(key, excludemin=True)
+            keys = list(islice(keys, size))
+        else:
+            keys = []
+            while len(keys) < size:
+                try:
+                    key = order.maxKey(key-1)
+                except ValueError:
+                    break
+                keys.append(key)
+            keys.reverse()
+
+        if not keys:
+            return [], None, None
+
+        next = previous = None
+        if order.maxKey() > keys[-1]:
+            next = 'n%x'%keys[-1]
+        if order.minKey() < keys[0]:
+            previous = 'p%x'%keys[0]
+
+        context = self.context
+        items = [context[order[key]] for key in keys]
+
+        if self.PREFETCH:
+            prefetch(items)
+        return items, next, previous
+
+    def _positionPage(self, cursor, direction, index, size):
+        # pages of order with unordered tail, cursors keep positions
+        names = self.keys()
+
+        if index is not None and direction in ('n', 'p'):
+            try:
+                index = names.index(self.order[index])
+            except (KeyError, ValueError):
+                raise ValueError('Invalid cursor: %r'%cursor)
+
+        if index is None:
+            start = 0
+        elif direction in ('n', 'N'):
+            start = index + 1
+        else:
+            start = max(index - size, 0)
+            size = index - start
+
+        selected = names[start:start+size]
+        if not selected:
+            return [], None, None
+
+        next = previous = None
+        if start + len(selected) < len(names):
+            next = 'N%x'%(start + len(selected) - 1)
+        if start:
+            previous = 'P%x'%start
+
+        context = self.context
+        items = [context[name] for name in selected]
+
+        if self.PREFETCH:
+            prefetch(items)
+        return items, next, previous
+
     def get(self, key, default=None):
         return self.context.get(key, default)
 
     def values(self):
         context = self.context
-        return [context[key] for key in self.order.values()]
+        values = [context[key] for key in self.keys()]
+
+        if self.PREFETCH:
+            prefetch(values)
+        return values
 
     def items(self):
         context = self.context
-        return [(key, context[key]) for key in self.order.values()]
+        items = [(key, context[key]) for key in self.keys()]
+
+        if self.PREFETCH:
+            prefetch([item for key, item in items])
+        return items
+
+    def iterkeys(self, start=None, stop=None):
+        start = start or 0
+        if stop is not None and stop <= start:
+            return iter(())
+
+        if not start:
+            names = self.keys()
+        elif self.positions is None or self.pending is not None:
+            names = islice(self.keys(), start, None)
+        else:
+            try:
+                names = self.order.values(self.positions.select(start))
+            except IndexError:
+                return iter(())
+
+        if stop is not None:
+            names = islice(names, stop - start)
+        return iter(names)
+
+    def itervalues(self, start=None, stop=None):
+        for name, item in self.iteritems(start, stop):
+            yield item
+
+    def iteritems(self, start=None, stop=None):
+        return releasedItems(self, self.iterkeys(start, stop))
 
     def __contains__(self, key):
         return self.context.has_key(key)
 
     has_key = __contains__
 
+    def _tailIndex(self, key):
+        # position of name in order with unordered tail
+        names = self.keys()
+        try:
+            return names, names.index(key)
+        except ValueError:
+            raise KeyError(key)
+
     def nextKey(self, key=None):
+        if self.pending is not None:
+            if key is None:
+                return self.keys()[-1]
+            names, idx = self._tailIndex(key)
+            return names[min(idx+1, len(names)-1)]
+
         if key is None:
-            return self.order.values()[-1]
+            return self.order[self.order.maxKey()]
         index = self.border[key]
         try:
             return self.order[self.order.minKey(index+1)]
@@ -131,43 +644,133 @@ class AnnotatableOrder(object):
             return self.order[index]
 
     def previousKey(self, key=None):
+        if self.pending is not None:
+            if key is None:
+                return self.keys()[0]
+            names, idx = self._tailIndex(key)
+            return names[max(idx-1, 0)]
+
         if key is None:
-            return self.order.values()[0]
+            return self.order[self.order.minKey()]
         index = self.border[key]
         try:
             return self.order[self.order.maxKey(index-1)]
         except (ValueError, KeyError):
             return self.order[index]
         
+    def neighbours(self, key, before=1, after=1):
+        if self.pending is not None:
+            names, idx = self._tailIndex(key)
+            return names[max(idx-before, 0):idx], names[idx+1:idx+1+after]
+
+        order = self.order
+        index = self.border[key]
+
+        if self.positions is None:
+            names = []
+            while len(names) < before:
+                try:
+                    index = order.maxKey(index-1)
+                except ValueError:
+                    break
+                names.insert(0, order[index])
+            idx = len(names)
+            names.extend(islice(order.values(self.border[key]), after+1))
+        else:
+            rank = self.positions.rank(index)
+            first = max(rank - before, 0)
+            idx = rank - first
+            names = list(islice(order.values(self.positions.select(first)),
+                                idx + after + 1))
+
+        return names[:idx], names[idx+1:]
+
     def keyPosition(self, key=None):
         if key is None:
             return 0
-        return self.border[key]
-    
+        if self.pending is not None:
+            return self._tailIndex(key)[1] + 1
+        if self.positions is None:
+            return len(self.order.keys(max=self.border[key]))
+        return self.positions.rank(self.border[key]) + 1
+
+    def keyAtPosition(self, position):
+        if position < 1:
+            raise KeyError(position)
+        try:
+            if self.positions is None or self.pending is not None:
+                return self.keys()[position-1]
+            return self.order[self.positions.select(position-1)]
+        except IndexError:
+            raise KeyError(position)
+
     def getByPosition(self, position=None):
-        return self.context[self.order[position]]
+        if position is None:
+            raise KeyError(position)
+        return self.context[self.keyAtPosition(position)]
 
 
 class Reordable(AnnotatableOrder):
     interface.implements(IReordable)
     component.adapts(IAnnotatableOrder)
 
+    # 'swap' - ObjectModifiedEvent for each swapped item,
+    # 'items' - one ObjectModifiedEvent for each moved item,
+    # 'container' - one container modified event for operation
+    notifications = 'swap'
+
+    def notifyMoved(self, names):
+        if not names:
+            return
+
+        context = self.context
+        mode = self.notifications
+
+        if mode == 'container':
+            notifyContainerModified(context)
+            return
+
+        if mode == 'items':
+            seen = set()
+            items = []
+            for name in names:
+                if name not in seen:
+                    seen.add(name)
+                    items.append(name)
+            names = items
+
+        for name in names:
+            notify(ObjectModifiedEvent(context[name]))
+
     def moveUp(self, names):
+        self.materializeTo(names)
+
         changed = False
+        moved = []
 
         order = self.order
-        orderKeys = order.keys()
         border = self.border
-        borderKeys = border.keys()
 
         idxs = [border[name] for name in names if name in border]
+        if not idxs:
+            return changed
         idxs.sort()
 
-        if idxs and orderKeys[0] == idxs[0]:
+        if self.pending is not None:
+            # item added while pending follows whole unordered tail
+            try:
+                first = order.minKey(self.tailEnd)
+            except ValueError:
+                first = None
+            if first in idxs:
+                self.materialize()
+
+        firstKey = order.minKey()
+        if firstKey == idxs[0]:
             minKey = idxs[0]
             idxs = idxs[1:]
         else:
-            minKey = orderKeys[0]-1
+            minKey = firstKey-1
 
         for idx in idxs:
             # new position on moved item
@@ -183,57 +786,51 @@ class Reordable(AnnotatableOrder):
             border[name1] = idx2
             border[name2] = idx
             changed = True
-            notify(ObjectModifiedEvent(self.context[name1]))
-            notify(ObjectModifiedEvent(self.context[name2]))
+            moved.extend((name1, name2))
+
+        self.notifyMoved(moved)
         return changed
 
     def moveTop(self, names):
-        changed = False
+        self.materializeTo(names)
+        self.upgrade()
 
         order = self.order
-        orderKeys = order.keys()
         border = self.border
-        borderKeys = border.keys()
 
-        zeroIdx = orderKeys[0]
+        names = self._movedNames(names)
+        if not names:
+            return False
 
-        idxs = [border[name] for name in names if name in border]
-        idxs.sort()
-        idxs.reverse()
+        names.sort(key=border.__getitem__)
+        if list(islice(order.values(), len(names))) == names:
+            return False
 
-        for idx in idxs:
-            if zeroIdx == idx:
-                continue
+        for name in names:
+            self._delKey(border[name])
 
-            name = order[idx]
-            zeroIdx = zeroIdx - 1
-            order[zeroIdx] = name
-            border[name] = zeroIdx
-
-            del order[idx]
-
-            changed = True
-            notify(ObjectModifiedEvent(self.context[name]))
-
-        return changed
+        return self._moveNames(names, None)
 
     def moveDown(self, names):
+        self.materializeTo(names)
+
         changed = False
+        moved = []
 
         order = self.order
-        orderKeys = order.keys()
         border = self.border
-        borderKeys = border.keys()
-
-        maxKey = orderKeys[-1]+1
 
         idxs = [border[name] for name in names if name in border]
+        if not idxs:
+            return changed
         idxs.sort()
         idxs.reverse()
 
+        topKey = order.maxKey()
+        maxKey = topKey+1
+
         for idx in idxs:
             # top position
-            topKey = orderKeys[-1]
             if idx >= topKey:
                 maxKey = topKey
                 continue
@@ -255,77 +852,519 @@ class Reordable(AnnotatableOrder):
             border[name1] = idx2
             border[name2] = idx
             changed = True
-            notify(ObjectModifiedEvent(self.context[name1]))
-            notify(ObjectModifiedEvent(self.context[name2]))
+            moved.extend((name1, name2))
 
+        self.notifyMoved(moved)
         return changed
 
     def moveBottom(self, names):
-        changed = False
+        self.materializeTo(names)
+        self.upgrade()
 
         order = self.order
-        orderKeys = order.keys()
         border = self.border
-        borderKeys = border.keys()
 
-        endIdx = orderKeys[-1]
+        names = self._movedNames(names)
+        if not names:
+            return False
 
-        idxs = [border[name] for name in names if name in border]
-        idxs.sort()
+        names.sort(key=border.__getitem__)
+        if (self.pending is None or order.maxKey() >= self.tailEnd) and \
+                self._lastNames(len(names)) == names:
+            return False
 
-        for idx in idxs:
-            # zero position
-            if endIdx == idx:
-                continue
+        for name in names:
+            self._delKey(border[name])
 
-            name = order[idx]
-            endIdx = endIdx + 1
-            order[endIdx] = name
-            border[name] = endIdx
+        # keys after last item and after keys reserved for unordered tail
+        for name in names:
+            self._setKey(self.generateKey(None), name)
 
-            del order[idx]
-            changed = True
-            notify(ObjectModifiedEvent(self.context[name]))
+        self.notifyMoved(names)
+        return True
 
-        return changed
+    def _lastNames(self, count):
+        # last `count` names of order, without walking whole order
+        order = self.order
+
+        names = []
+        try:
+            key = order.maxKey()
+            while len(names) < count:
+                names.append(order[key])
+                key = order.maxKey(key-1)
+        except ValueError:
+            pass
+        names.reverse()
+        return names
+
+    def moveAfter(self, names, anchor=None):
+        self.materializeTo(list(names) + [anchor])
+        self.upgrade()
+
+        order = self.order
+        border = self.border
+
+        names = self._movedNames(names, anchor)
+        if not names:
+            return False
+
+        if anchor is None:
+            key = None
+            current = order.values()
+        else:
+            key = border[anchor]
+            current = order.values(key, excludemin=True)
+
+        if list(islice(current, len(names))) == names:
+            return False
+
+        for name in names:
+            self._delKey(border[name])
+
+        return self._moveNames(names, anchor)
+
+    def moveToPosition(self, names, position):
+        self.materializeTo(names)
+        self.upgrade()
+
+        order = self.order
+        border = self.border
+
+        names = self._movedNames(names)
+        if not names:
+            return False
+
+        current = order.values(border[names[0]])
+        if list(islice(current, len(names))) == names and \
+                self.keyPosition(names[0]) == position:
+            return False
+
+        for name in names:
+            self._delKey(border[name])
+
+        anchor = None
+        count = len(self) - len(names)
+        if position > 1 and count:
+            anchor = self.keyAtPosition(min(position-1, count))
+            self.materializeTo((anchor,))
+
+        return self._moveNames(names, anchor)
+
+    def _movedNames(self, names, anchor=None):
+        border = self.border
+
+        seen = set()
+        result = []
+        for name in names:
+            if name in border and name != anchor and name not in seen:
+                seen.add(name)
+                result.append(name)
+        return result
+
+    def _moveNames(self, names, anchor):
+        # moved names are removed from order tree already
+        order = self.order
+        border = self.border
+
+        if anchor is None:
+            keys = self.allocateKeys(None, len(names))
+        else:
+            key = border[anchor]
+            keys = self.allocateKeys(key, len(names))
+            if keys is None or (self.pending is not None and
+                                key < self.tailEnd <= keys[-1]):
+                # respacing and keys after reserved keys need whole tail
+                self.materialize()
+                keys = self.allocateKeys(key, len(names))
+            if keys is None:
+                self.renumber(anchor, len(names))
+                keys = self.allocateKeys(border[anchor], len(names))
+
+        for key, name in zip(keys, names):
+            self._setKey(key, name)
+
+        self.notifyMoved(names)
+        return True
 
     def updateOrder(self, order):
         if not isinstance(order, types.ListType) and \
             not isinstance(order, types.TupleType):
             raise TypeError('order must be a tuple or a list.')
 
-        if len(order) != len(self.order):
+        if len(order) != len(self):
             raise ValueError("Incompatible key set.")
 
-        was_dict = {}
-        will_be_dict = {}
-        new_order = {}
+        self.upgrade()
 
-        orderValues = self.order.values()
-
-        for i in range(len(order)):
-            was_dict[orderValues[i]] = 1
-            will_be_dict[order[i]] = 1
-            new_order[i] = order[i]
+        # names of unordered tail have no keys, they are placed
+        # by new order without merging tail first
+        border = self.border
+        context = self.context
+        keys = [border.get(name) for name in order]
+        for name, key in zip(order, keys):
+            if key is None and (self.pending is None or
+                                not context.has_key(name)):
+                raise ValueError("Incompatible key set.")
 
-        if will_be_dict != was_dict:
+        if len(set(order)) != len(order):
             raise ValueError("Incompatible key set.")
 
-        order = []
-        keys = list(new_order.keys())
-        keys.sort()
-        for key in keys:
-            if new_order[key] not in order:
-                order.append(new_order[key])
+        # items that keep their keys
+        keyed = [idx for idx in range(len(keys)) if keys[idx] is not None]
+        stable = set([keyed[idx] for idx in
+                      increasingSubsequence([keys[idx] for idx in keyed])])
+        if len(stable) == len(keys):
+            return
 
-        self.order.clear()
-        self.border.clear()
+        for idx in keyed:
+            if idx not in stable:
+                self._delKey(keys[idx])
+
+        key = None
+        moved = []
+        placed = True
+        for idx in range(len(keys) + 1):
+            if idx == len(keys) or idx in stable:
+                if moved and not self._placeNames(key, moved):
+                    placed = False
+                    break
+                if idx < len(keys):
+                    key = keys[idx]
+                moved = []
+            else:
+                moved.append(order[idx])
+
+        if not placed:
+            # no gap for moved items, respace whole order
+            self.order.clear()
+
+            spacing = self.KEY_SPACING
+            for idx in range(len(order)):
+                key = (idx + 1) * spacing
+                self.order[key] = order[idx]
+                border[order[idx]] = key
+            self.positions.load(self.order.keys())
+
+        if self.pending is not None:
+            self.length.set(len(order))
+            self.pending = self.tailEnd = None
+            self.store()
 
-        for idx in range(len(order)):
-            self.order[idx] = order[idx]
-            self.border[order[idx]] = idx
         notifyContainerModified(self)
 
+    def _placeNames(self, key, names):
+        keys = self.allocateKeys(key, len(names))
+        if keys is None:
+            return False
+
+        for key, name in zip(keys, names):
+            self._setKey(key, name)
+        return True
+
+
+class KeysOrder(object):
+    """ order of container keys, nothing is stored """
+    interface.implements(IOrder)
+    component.adapts(IUnorderedContainer)
+
+    BATCH_SIZE = AnnotatableOrder.BATCH_SIZE
+    PREFETCH = AnnotatableOrder.PREFETCH
+
+    def __init__(self, context):
+        self.context = context
+
+        # keys tree of btree container
+        data = getattr(
+            removeAllProxies(context), '_SampleContainer__data', None)
+        if not hasattr(data, 'maxKey'):
+            data = None
+        self.data = data
+
+    def addItem(self, name):
+        pass
+
+    def removeItem(self, name):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def _keys(self, min=None, max=None):
+        # keys after `min` or before `max`
+        data = self.data
+        if data is not None:
+            if min is not None:
+                return data.keys(min=min, excludemin=True)
+            if max is not None:
+                return data.keys(max=max, excludemax=True)
+            return data.keys()
+
+        names = list(self.context.keys())
+        try:
+            if min is not None:
+                return names[names.index(min)+1:]
+            if max is not None:
+                return names[:names.index(max)]
+        except ValueError:
+            raise KeyError(min or max)
+        return names
+
+    def keys(self):
+        return self.context.keys()
+
+    def __len__(self):
+        return len(self.context)
+
+    def __iter__(self):
+        return iter(self.context.keys())
+
+    def __getitem__(self, key):
+        if isinstance(key, types.SliceType):
+            context = self.context
+            items = [context[name] for name in self._keys()[key]]
+
+            if self.PREFETCH:
+                prefetch(items)
+            return items
+        else:
+            return self.context[key]
+
+    def page(self, cursor=None, size=20):
+        name = None
+        if cursor is None:
+            direction = 'n'
+        else:
+            direction = cursor[:1]
+            try:
+                name = cursor[1:].decode('hex').decode('utf-8')
+            except (TypeError, UnicodeError):
+                direction = None
+            if direction not in ('n', 'p'):
+                raise ValueError('Invalid cursor: %r'%cursor)
+
+        if direction == 'n':
+            names = list(islice(self._keys(min=name), size + 1))
+            hasNext = len(names) > size
+            names = names[:size]
+            hasPrevious = name is not None
+        elif self.data is not None:
+            names = previousNames(self.data, name, size)
+            hasPrevious = bool(names) and \
+                previousName(self.data, names[0]) is not None
+            hasNext = True
+        else:
+            names = self._keys(max=name)
+            hasPrevious = len(names) > size
+            names = list(names[-size:])
+            hasNext = True
+
+        if not names:
+            return [], None, None
+
+        next = previous = None
+        if hasNext:
+            next = 'n%s'%names[-1].encode('utf-8').encode('hex')
+        if hasPrevious:
+            previous = 'p%s'%names[0].encode('utf-8').encode('hex')
+
+        context = self.context
+        items = [context[name] for name in names]
+
+        if self.PREFETCH:
+            prefetch(items)
+        return items, next, previous
+
+    def get(self, key, default=None):
+        return self.context.get(key, default)
+
+    def values(self):
+        context = self.context
+        values = [context[key] for key in self.context.keys()]
+
+        if self.PREFETCH:
+            prefetch(values)
+        return values
+
+    def items(self):
+        context = self.context
+        items = [(key, context[key]) for key in self.context.keys()]
+
+        if self.PREFETCH:
+            prefetch([item for key, item in items])
+        return items
+
+    def iterkeys(self, start=None, stop=None):
+        return islice(iter(self.context.keys()), start or 0, stop)
+
+    def itervalues(self, start=None, stop=None):
+        for name, item in self.iteritems(start, stop):
+            yield item
+
+    def iteritems(self, start=None, stop=None):
+        return releasedItems(self, self.iterkeys(start, stop))
+
+    def __contains__(self, key):
+        return self.context.has_key(key)
+
+    has_key = __contains__
+
+    def nextKey(self, key=None):
+        if key is None:
+            return self._keys()[-1]
+        if key not in self.context:
+            raise KeyError(key)
+        for name in self._keys(min=key):
+            return name
+        return key
+
+    def previousKey(self, key=None):
+        if key is None:
+            return self._keys()[0]
+        if key not in self.context:
+            raise KeyError(key)
+        names = self._keys(max=key)
+        if len(names):
+            return names[-1]
+        return key
+
+    def neighbours(self, key, before=1, after=1):
+        if key not in self.context:
+            raise KeyError(key)
+
+        names = []
+        if before:
+            names = list(self._keys(max=key)[-before:])
+        return names, list(islice(self._keys(min=key), after))
+
+    def keyPosition(self, key=None):
+        if key is None:
+            return 0
+        if key not in self.context:
+            raise KeyError(key)
+        return len(self._keys(max=key)) + 1
+
+    def keyAtPosition(self, position):
+        if position < 1:
+            raise KeyError(position)
+        try:
+            return self._keys()[position-1]
+        except IndexError:
+            raise KeyError(position)
+
+    def getByPosition(self, position=None):
+        if position is None:
+            raise KeyError(position)
+        return self.context[self.keyAtPosition(position)]
+
+
+def previousName(tree, name):
+    """ greatest key of btree before `name`, None if there is no such key """
+    if not name:
+        return None
+
+    # greatest string before name, up to keys with max characters
+    name = unicode(name)
+    last = ord(name[-1])
+    if last:
+        bound = name[:-1] + unichr(last - 1) + MAXCHAR
+    else:
+        bound = name[:-1]
+
+    try:
+        key = tree.maxKey(bound)
+    except ValueError:
+        key = None
+
+    # usually empty range
+    for key in tree.keys(min=bound, max=name, excludemax=True):
+        pass
+    return key
+
+
+def previousNames(tree, name, size):
+    """ `size` keys of btree before `name`, in key order """
+    names = []
+    while len(names) < size:
+        name = previousName(tree, name)
+        if name is None:
+            break
+        names.append(name)
+    names.reverse()
+    return names
+
+
+def releasedItems(order, names):
+    """ (name, item) pairs, items are released to pickle cache by batches """
+    context = order.context
+
+    while True:
+        batch = [(name, context[name])
+                 for name in islice(names, order.BATCH_SIZE)]
+        if not batch:
+            break
+
+        items = [item for name, item in batch]
+        states = [getattr(removeAllProxies(item), '_p_changed', 0)
+                  for item in items]
+
+        if order.PREFETCH:
+            prefetch(items)
+
+        for name, item in batch:
+            yield name, item
+
+        deactivate(zip(items, states))
+
+
+def prefetch(items):
+    """ load ghost items in one request, if storage supports prefetch """
+    jars = {}
+    for item in items:
+        item = removeAllProxies(item)
+        if getattr(item, '_p_changed', 0) is None:
+            jar = item._p_jar
+            jars.setdefault(id(jar), (jar, []))[1].append(item)
+
+    for jar, items in jars.values():
+        method = getattr(jar, 'prefetch', None)
+        if method is not None:
+            method(items)
+
+
+def deactivate(batch):
+    """ turn back to ghosts unchanged items that were ghosts """
+    for item, state in batch:
+        item = removeAllProxies(item)
+        if state is None and item._p_changed is False:
+            item._p_deactivate()
+
+
+def increasingSubsequence(values):
+    """ indexes of longest increasing subsequence of values """
+    tails = []
+    tailIndexes = []
+    previous = [None] * len(values)
+
+    for idx in range(len(values)):
+        pos = bisect_left(tails, values[idx])
+        if pos:
+            previous[idx] = tailIndexes[pos-1]
+        if pos == len(tails):
+            tails.append(values[idx])
+            tailIndexes.append(idx)
+        else:
+            tails[pos] = values[idx]
+            tailIndexes[pos] = idx
+
+    result = set()
+    if tailIndexes:
+        idx = tailIndexes[-1]
+        while idx is not None:
+            result.add(idx)
+            idx = previous[idx]
+    return result
+
 
 @component.adapter(IObjectMovedEvent)
 def itemMoved(event):
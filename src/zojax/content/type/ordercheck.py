@@ -0,0 +1,153 @@
+##############################################################################
+#
+# Copyright (c) 2009 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+""" check and repair container orders of content tree
+
+Run with zope instance, for example `bin/instance run script.py`:
+
+  from zojax.content.type.ordercheck import checkOrders
+  checkOrders(root, repair=True)
+
+$Id$
+"""
+import logging
+import transaction
+
+from zope.proxy import removeAllProxies
+from zope.annotation.interfaces import IAnnotations
+from zope.app.container.interfaces import IReadContainer
+
+from order import AnnotatableOrder
+from interfaces import IOrder, IAnnotatableOrder, IUnorderedContainer
+
+logger = logging.getLogger('zojax.content.type')
+
+
+def walk(root):
+    """ iterate (path, container) for containers with annotatable order,
+    depth first, only iterators of current branch are kept """
+    for path, ob in iterObjects(root):
+        if isChecked(ob):
+            yield path, ob
+
+
+def iterObjects(root):
+    """ iterate (path, object) for all objects of content tree """
+    stack = [(u'', iter([(u'', root)]))]
+
+    while stack:
+        path, items = stack[-1]
+        try:
+            name, ob = items.next()
+        except StopIteration:
+            stack.pop()
+            continue
+
+        ob = removeAllProxies(ob)
+        if name:
+            obpath = u'%s/%s'%(path, name)
+        else:
+            obpath = path
+
+        yield obpath or u'/', ob
+
+        if IReadContainer.providedBy(ob):
+            stack.append((obpath, iterItems(ob)))
+
+
+def isChecked(ob):
+    return IAnnotatableOrder.providedBy(ob) and \
+        not IUnorderedContainer.providedBy(ob)
+
+
+def iterItems(container):
+    for name in container.keys():
+        yield name, container[name]
+
+
+def checkOrders(root, repair=False, chunk=100, limit=20, report=None,
+                merge=1000):
+    """ check orders of containers, repairs are committed and pickle cache
+    is collected after each `chunk` visited objects, unordered tails are
+    merged and keys are respaced and committed by `merge` names,
+    return (checked, broken) """
+    if report is None:
+        report = logReport
+
+    visited = checked = broken = changed = 0
+    jar = getattr(removeAllProxies(root), '_p_jar', None)
+
+    for path, container in iterObjects(root):
+        visited += 1
+        if not visited % chunk:
+            if changed:
+                transaction.commit()
+                changed = 0
+            else:
+                transaction.abort()
+
+            if jar is not None:
+                jar.cacheGC()
+
+        if not isChecked(container):
+            continue
+
+        checked += 1
+
+        data = IAnnotations(container).get(AnnotatableOrder.ANNOTATION_KEY)
+
+        order = IOrder(container, None)
+        if not isinstance(order, AnnotatableOrder):
+            continue
+
+        problems = order.check(limit)
+        if data is None:
+            problems.insert(0, ('no order', None))
+
+        if problems and repair:
+            while not order.materialize(merge):
+                transaction.commit()
+                if jar is not None:
+                    jar.cacheGC()
+
+            codes = set([problem for problem, name in problems])
+            codes.difference_update(('no order', 'pending'))
+            if codes:
+                order.repair(False)
+
+            if 'keys' in codes:
+                for count in order.compactKeys(merge):
+                    transaction.commit()
+                    if jar is not None:
+                        jar.cacheGC()
+
+        if problems:
+            broken += 1
+            report(path, problems)
+
+            if repair:
+                changed += 1
+                transaction.savepoint(True)
+
+    if changed:
+        transaction.commit()
+    else:
+        transaction.abort()
+
+    return checked, broken
+
+
+def logReport(path, problems):
+    logger.warning('Container order %s: %s', path, ', '.join(
+            [name and '%s %s'%(problem, name) or problem
+             for problem, name in problems]))
@@ -0,0 +1,270 @@
+##############################################################################
+#
+# Copyright (c) 2009 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+""" ordinal index of order keys
+
+Counted b+tree of integer keys, nodes keep number of keys in each child,
+so position of key and key at position are found in O(log n).
+Concurrent inserts and removes in same leaf, and count changes in
+nodes are resolved on conflict, like in BTrees.
+
+$Id$
+"""
+from bisect import bisect_left, bisect_right
+
+from persistent import Persistent
+from ZODB.POSException import ConflictError
+
+
+class Leaf(Persistent):
+    """ sorted keys """
+
+    MAX_SIZE = 120
+
+    def __init__(self, keys=()):
+        self.keys = list(keys)
+        self.generation = 0
+
+    def __len__(self):
+        return len(self.keys)
+
+    def minKey(self):
+        return self.keys[0]
+
+    def insert(self, key):
+        keys = self.keys
+        idx = bisect_left(keys, key)
+        if idx < len(keys) and keys[idx] == key:
+            return False, None
+
+        keys.insert(idx, key)
+        self._p_changed = True
+
+        if len(keys) > self.MAX_SIZE:
+            return True, self.split()
+        return True, None
+
+    def split(self):
+        keys = self.keys
+        half = len(keys) // 2
+        sibling = self.__class__(keys[half:])
+        self.keys = keys[:half]
+        self.generation += 1
+        return sibling
+
+    def remove(self, key):
+        keys = self.keys
+        idx = bisect_left(keys, key)
+        if idx == len(keys) or keys[idx] != key:
+            raise KeyError(key)
+
+        del keys[idx]
+        self._p_changed = True
+
+    def rank(self, key):
+        return bisect_left(self.keys, key)
+
+    def select(self, idx):
+        return self.keys[idx]
+
+    def __iter__(self):
+        return iter(self.keys)
+
+    def _p_resolveConflict(self, old, committed, new):
+        if not (old['generation'] == committed['generation']
+                == new['generation']):
+            raise ConflictError
+
+        oldKeys = set(old['keys'])
+        newKeys = set(new['keys'])
+        committedKeys = set(committed['keys'])
+
+        added = newKeys - oldKeys
+        removed = oldKeys - newKeys
+
+        if removed - committedKeys or added & committedKeys:
+            raise ConflictError
+
+        keys = (committedKeys | added) - removed
+        if not keys:
+            raise ConflictError
+
+        result = dict(committed)
+        result['keys'] = sorted(keys)
+        return result
+
+
+class Node(Persistent):
+    """ children with their min keys and number of keys """
+
+    MAX_SIZE = 60
+
+    def __init__(self, children=()):
+        self.children = list(children)
+        self.mins = [child.minKey() for child in self.children]
+        self.counts = [len(child) for child in self.children]
+        self.generation = 0
+
+    def __len__(self):
+        return sum(self.counts)
+
+    def minKey(self):
+        return self.mins[0]
+
+    def _child(self, key):
+        return max(bisect_right(self.mins, key) - 1, 0)
+
+    def insert(self, key):
+        idx = self._child(key)
+        child = self.children[idx]
+
+        inserted, sibling = child.insert(key)
+        if not inserted:
+            return False, None
+
+        if key < self.mins[idx]:
+            self.mins[idx] = key
+        self.counts[idx] += 1
+
+        if sibling is not None:
+            self.counts[idx] = len(child)
+            self.children.insert(idx+1, sibling)
+            self.mins.insert(idx+1, sibling.minKey())
+            self.counts.insert(idx+1, len(sibling))
+            self.generation += 1
+
+        self._p_changed = True
+
+        if len(self.children) > self.MAX_SIZE:
+            return True, self.split()
+        return True, None
+
+    def split(self):
+        half = len(self.children) // 2
+        sibling = self.__class__()
+        sibling.children = self.children[half:]
+        sibling.mins = self.mins[half:]
+        sibling.counts = self.counts[half:]
+        self.children = self.children[:half]
+        self.mins = self.mins[:half]
+        self.counts = self.counts[:half]
+        self.generation += 1
+        return sibling
+
+    def remove(self, key):
+        idx = self._child(key)
+        child = self.children[idx]
+        child.remove(key)
+
+        self.counts[idx] -= 1
+        if not self.counts[idx] and len(self.children) > 1:
+            del self.children[idx]
+            del self.mins[idx]
+            del self.counts[idx]
+            child.generation += 1
+            self.generation += 1
+        elif self.mins[idx] == key and self.counts[idx]:
+            self.mins[idx] = child.minKey()
+
+        self._p_changed = True
+
+    def rank(self, key):
+        idx = self._child(key)
+        return sum(self.counts[:idx]) + self.children[idx].rank(key)
+
+    def select(self, idx):
+        for child, count in zip(self.children, self.counts):
+            if idx < count:
+                return child.select(idx)
+            idx -= count
+        raise IndexError(idx)
+
+    def __iter__(self):
+        for child in self.children:
+            for key in child:
+                yield key
+
+    def _p_resolveConflict(self, old, committed, new):
+        if not (old['generation'] == committed['generation']
+                == new['generation']):
+            raise ConflictError
+
+        mins = []
+        for o, c, n in zip(old['mins'], committed['mins'], new['mins']):
+            if c == o:
+                mins.append(n)
+            elif n == o or n == c:
+                mins.append(c)
+            else:
+                raise ConflictError
+
+        counts = [c + n - o for o, c, n in
+                  zip(old['counts'], committed['counts'], new['counts'])]
+
+        result = dict(committed)
+        result['mins'] = mins
+        result['counts'] = counts
+        return result
+
+
+class PositionIndex(Persistent):
+    """ ordinal index of keys """
+
+    def __init__(self, keys=()):
+        self.load(keys)
+
+    def load(self, keys):
+        """ replace content of index with sorted `keys` """
+        keys = list(keys)
+        size = Leaf.MAX_SIZE // 2 or 1
+
+        nodes = [Leaf(keys[idx:idx+size])
+                 for idx in range(0, len(keys), size)] or [Leaf()]
+
+        size = max(Node.MAX_SIZE // 2, 2)
+        while len(nodes) > 1:
+            nodes = [Node(nodes[idx:idx+size])
+                     for idx in range(0, len(nodes), size)]
+
+        self.root = nodes[0]
+
+    def __len__(self):
+        return len(self.root)
+
+    def __iter__(self):
+        return iter(self.root)
+
+    def insert(self, key):
+        root = self.root
+        inserted, sibling = root.insert(key)
+        if sibling is not None:
+            self.root = Node((root, sibling))
+
+    def remove(self, key):
+        root = self.root
+        root.remove(key)
+
+        if isinstance(root, Node) and len(root.children) == 1:
+            self.root = root.children[0]
+
+    def rank(self, key):
+        """ number of keys less than `key` """
+        if not len(self.root):
+            return 0
+        return self.root.rank(key)
+
+    def select(self, idx):
+        """ key at 0-based position `idx` """
+        if idx < 0 or idx >= len(self.root):
+            raise IndexError(idx)
+        return self.root.select(idx)
@@ -0,0 +1,151 @@
+##############################################################################
+#
+# Copyright (c) 2009 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+""" sharded btree mapping
+
+Keys are spread over fixed number of btrees by crc32 of key, each shard
+has own length counter, so concurrent writes mostly change different
+persistent objects. Keys, values and items are merged from shards in
+key order.
+
+$Id$
+"""
+from zlib import crc32
+from heapq import merge
+from itertools import islice
+
+from persistent import Persistent
+from BTrees.Length import Length
+from BTrees.OOBTree import OOBTree
+
+_marker = object()
+
+
+class ShardedTree(Persistent):
+    """ mapping of btree shards """
+
+    def __init__(self, size=64):
+        self.shards = tuple([OOBTree() for idx in range(size)])
+        self.lengths = tuple([Length() for idx in range(size)])
+
+    def _index(self, key):
+        if isinstance(key, unicode):
+            key = key.encode('utf-8')
+        return (crc32(key) & 0xffffffff) % len(self.shards)
+
+    def __getitem__(self, key):
+        return self.shards[self._index(key)][key]
+
+    def get(self, key, default=None):
+        return self.shards[self._index(key)].get(key, default)
+
+    def __contains__(self, key):
+        return key in self.shards[self._index(key)]
+
+    has_key = __contains__
+
+    def __setitem__(self, key, value):
+        idx = self._index(key)
+        if self.shards[idx].insert(key, value):
+            self.lengths[idx].change(1)
+        else:
+            self.shards[idx][key] = value
+
+    def __delitem__(self, key):
+        idx = self._index(key)
+        del self.shards[idx][key]
+        self.lengths[idx].change(-1)
+
+    def __len__(self):
+        return sum([length() for length in self.lengths])
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def keys(self, min=None, max=None, excludemin=False, excludemax=False):
+        return ShardedSequence(
+            [shard.keys(min, max, excludemin, excludemax)
+             for shard in self.shards])
+
+    def items(self, min=None, max=None, excludemin=False, excludemax=False):
+        return ShardedSequence(
+            [shard.items(min, max, excludemin, excludemax)
+             for shard in self.shards])
+
+    def values(self, min=None, max=None, excludemin=False, excludemax=False):
+        return ShardedValues(
+            [shard.items(min, max, excludemin, excludemax)
+             for shard in self.shards])
+
+    def minKey(self, key=_marker):
+        keys = []
+        for shard in self.shards:
+            try:
+                if key is _marker:
+                    keys.append(shard.minKey())
+                else:
+                    keys.append(shard.minKey(key))
+            except ValueError:
+                pass
+        if not keys:
+            raise ValueError('empty tree')
+        return min(keys)
+
+    def maxKey(self, key=_marker):
+        keys = []
+        for shard in self.shards:
+            try:
+                if key is _marker:
+                    keys.append(shard.maxKey())
+                else:
+                    keys.append(shard.maxKey(key))
+            except ValueError:
+                pass
+        if not keys:
+            raise ValueError('empty tree')
+        return max(keys)
+
+
+class ShardedSequence(object):
+    """ lazy sorted keys or items of shards """
+
+    def __init__(self, sequences):
+        self.sequences = sequences
+
+    def __iter__(self):
+        return merge(*self.sequences)
+
+    def __len__(self):
+        return sum([len(keys) for keys in self.sequences])
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step < 0:
+                return list(self)[index]
+            return list(islice(self, start, stop, step))
+
+        if index < 0:
+            index += len(self)
+        if index >= 0:
+            for key in islice(self, index, index + 1):
+                return key
+        raise IndexError(index)
+
+
+class ShardedValues(ShardedSequence):
+    """ lazy values of shards in key order """
+
+    def __iter__(self):
+        for key, value in merge(*self.sequences):
+            yield value
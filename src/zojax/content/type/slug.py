@@ -0,0 +1,96 @@
+##############################################################################
+#
+# Copyright (c) 2009 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+""" title based names
+
+$Id$
+"""
+import re, threading
+from collections import OrderedDict
+
+# non word characters, one letter words, runs of dashes
+NONWORD = re.compile(r'\W', re.UNICODE)
+SHORTWORD = re.compile(r'^\w-|-\w-|-\w$', re.UNICODE)
+DASHES = re.compile(r'-{2,}')
+
+
+def slugify(title, limit_words=0):
+    """ url name for title """
+    name = DASHES.sub(
+        '-', SHORTWORD.sub('-', NONWORD.sub('-', title.strip())))
+    name = name.strip('-').lower()
+
+    if limit_words:
+        name = '-'.join(name.split('-')[0:limit_words])
+    return name
+
+
+class SlugEngine(object):
+    """ slugify with bounded LRU cache of names """
+
+    def __init__(self, size=1000):
+        self.size = size
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+
+    def slug(self, title, limit_words=0, transliterate=None):
+        key = (title, limit_words, transliterate)
+
+        lock = self.lock
+        cache = self.cache
+
+        lock.acquire()
+        try:
+            name = cache.pop(key, None)
+            if name is not None:
+                cache[key] = name
+                return name
+        finally:
+            lock.release()
+
+        if transliterate is not None:
+            name = slugify(transliterate(title), limit_words)
+        else:
+            name = slugify(title, limit_words)
+
+        lock.acquire()
+        try:
+            cache[key] = name
+            while len(cache) > self.size:
+                cache.popitem(False)
+        finally:
+            lock.release()
+
+        return name
+
+    def slugs(self, titles, limit_words=0, transliterate=None):
+        """ names for many titles, same titles are slugified once """
+        names = {}
+        result = []
+        for title in titles:
+            name = names.get(title)
+            if name is None:
+                name = names[title] = \
+                    self.slug(title, limit_words, transliterate)
+            result.append(name)
+        return result
+
+    def clear(self):
+        self.lock.acquire()
+        try:
+            self.cache.clear()
+        finally:
+            self.lock.release()
+
+
+engine = SlugEngine()
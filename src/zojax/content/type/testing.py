@@ -45,6 +45,7 @@ def setUpContents(*args):
     component.provideAdapter(constraints.contains)
     component.provideAdapter(constraints.ctContains)
     component.provideAdapter(constraints.containers)
+    component.provideHandler(constraints.registrationChanged)
     component.provideAdapter(container.NameChooser)
     component.provideAdapter(container.TitleBasedNameChooser)
 
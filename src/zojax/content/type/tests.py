@@ -27,7 +27,7 @@ from zope.securitypolicy.interfaces import IPrincipalPermissionManager
 from zope.securitypolicy.principalpermission import \
     AnnotationPrincipalPermissionManager
 
-from zojax.content.type import interfaces, order
+from zojax.content.type import interfaces, order, typeindex
 from zojax.content.type.item import PersistentItem
 from zojax.content.type.container import \
     ContentContainer, TitleBasedNameChooser, NameChooser
@@ -97,6 +97,9 @@ def setUp(test):
     component.provideAdapter(TitleBasedNameChooser)
     component.provideHandler(order.itemMoved)
     component.provideAdapter(order.Reordable, provides=interfaces.IOrder)
+    component.provideAdapter(order.KeysOrder)
+    component.provideAdapter(typeindex.TypeIndex)
+    component.provideHandler(typeindex.itemMoved)
     component.provideAdapter(ContentSearchableText)
     setup.setUpTestAsModule(test, 'zojax.content.TESTS')
 
@@ -116,6 +119,13 @@ def test_suite():
             './order.txt',
             setUp=setUp, tearDown=tearDown,
             optionflags=doctest.NORMALIZE_WHITESPACE|doctest.ELLIPSIS),
+        doctest.DocFileSuite(
+            './positions.txt',
+            optionflags=doctest.NORMALIZE_WHITESPACE|doctest.ELLIPSIS),
+        doctest.DocFileSuite(
+            './slug.txt',
+            setUp=setUp, tearDown=tearDown, encoding='utf-8',
+            optionflags=doctest.NORMALIZE_WHITESPACE|doctest.ELLIPSIS),
         doctest.DocFileSuite(
             './container.txt',
             setUp=setUp, tearDown=tearDown,
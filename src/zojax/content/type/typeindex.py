@@ -0,0 +1,257 @@
+##############################################################################
+#
+# Copyright (c) 2009 Zope Foundation and Contributors.
+# All Rights Reserved.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE.
+#
+##############################################################################
+""" per container index of items by content type
+
+$Id$
+"""
+from itertools import islice
+from BTrees.Length import Length
+from BTrees.OOBTree import OOBTree, OOTreeSet
+
+from zope import interface, component
+from zope.proxy import removeAllProxies
+from zope.annotation.interfaces import IAnnotations
+from zope.app.container.interfaces import IObjectMovedEvent
+
+from order import AnnotatableOrder, releasedItems, prefetch
+from order import previousName, previousNames
+from interfaces import IContentType, ITypeIndex, ITypeIndexedContainer
+
+
+class TypeIndex(object):
+    """ content type name -> item names, items of type are in name order,
+    reads don't index pending items, they use indexed items only """
+    interface.implements(ITypeIndex)
+    component.adapts(ITypeIndexedContainer)
+
+    ANNOTATION_KEY = 'zojax.content-typeindex'
+
+    BATCH_SIZE = AnnotatableOrder.BATCH_SIZE
+    PREFETCH = AnnotatableOrder.PREFETCH
+
+    # names of unindexed items indexed by each addItem,
+    # 0 leaves indexing to `materialize` calls
+    MERGE_SIZE = AnnotatableOrder.MERGE_SIZE
+
+    def __init__(self, context):
+        annotations = IAnnotations(removeAllProxies(context))
+
+        self.context = context
+        self.annotations = annotations
+
+        data = annotations.get(self.ANNOTATION_KEY)
+        if data is None:
+            # existing items are indexed by chunks later
+            if len(context):
+                self.initialize(u'')
+            else:
+                self.initialize()
+        else:
+            self.types, self.counts, self.names = data[:3]
+            self.pending = None
+            if len(data) > 3:
+                self.pending = data[3]
+
+    def initialize(self, pending=None):
+        # type -> names, type -> length, name -> type
+        self.types = OOBTree()
+        self.counts = OOBTree()
+        self.names = OOBTree()
+        self.pending = pending
+        self.store()
+
+    def store(self):
+        data = [self.types, self.counts, self.names]
+        if self.pending is not None:
+            data.append(self.pending)
+        self.annotations[self.ANNOTATION_KEY] = data
+
+    def unindexed(self):
+        """ names of container not indexed yet """
+        marker = self.pending
+        if marker is None:
+            return
+
+        names = None
+        if marker:
+            # btree containers iterate keys from marker
+            try:
+                names = self.context.keys(marker)
+            except TypeError:
+                pass
+        if names is None:
+            names = self.context.keys()
+
+        indexed = self.names
+        for name in names:
+            if name not in indexed:
+                yield name
+
+    def materialize(self, limit=None):
+        """ index `limit` unindexed items, return True if index
+        is complete """
+        if self.pending is None:
+            return True
+
+        names = self.unindexed()
+        if limit is not None:
+            names = islice(names, limit)
+        names = list(names)
+
+        context = self.context
+        for name in names:
+            self._index(name, context[name])
+
+        if limit is None or len(names) < limit:
+            self.pending = None
+        else:
+            self.pending = names[-1]
+        self.store()
+        return self.pending is None
+
+    def rebuild(self):
+        self.initialize(u'')
+        self.materialize()
+
+    def _index(self, name, item):
+        contenttype = IContentType(item, None)
+        if contenttype is None:
+            return
+
+        tname = contenttype.name
+        old = self.names.get(name)
+        if old == tname:
+            return
+        if old is not None:
+            self.removeItem(name)
+
+        names = self.types.get(tname)
+        if names is None:
+            names = self.types[tname] = OOTreeSet()
+            self.counts[tname] = Length()
+
+        names.insert(name)
+        self.counts[tname].change(1)
+        self.names[name] = tname
+
+    def addItem(self, name, item):
+        self._index(name, item)
+
+        if self.pending is not None and self.MERGE_SIZE:
+            self.materialize(self.MERGE_SIZE)
+
+    def removeItem(self, name):
+        tname = self.names.get(name)
+        if tname is None:
+            return
+
+        del self.names[name]
+        self.types[tname].remove(name)
+        self.counts[tname].change(-1)
+
+    def typeNames(self):
+        counts = self.counts
+        return [tname for tname in counts.keys() if counts[tname]()]
+
+    def count(self, typename):
+        length = self.counts.get(typename)
+        if length is None:
+            return 0
+        return length()
+
+    def typeOf(self, name):
+        tname = self.names.get(name)
+        if tname is None and self.pending is not None:
+            # single item is checked directly
+            item = self.context.get(name)
+            contenttype = IContentType(item, None)
+            if contenttype is not None:
+                tname = contenttype.name
+        return tname
+
+    def _keys(self, typename, min=None):
+        names = self.types.get(typename)
+        if names is None:
+            return ()
+        if min is not None:
+            return names.keys(min=min, excludemin=True)
+        return names.keys()
+
+    def keys(self, typename):
+        return self._keys(typename)
+
+    def values(self, typename):
+        context = self.context
+        values = [context[name] for name in self._keys(typename)]
+
+        if self.PREFETCH:
+            prefetch(values)
+        return values
+
+    def iteritems(self, typename, start=None, stop=None):
+        return releasedItems(
+            self, islice(iter(self._keys(typename)), start or 0, stop))
+
+    def page(self, typename, cursor=None, size=20):
+        name = None
+        if cursor is None:
+            direction = 'n'
+        else:
+            direction = cursor[:1]
+            try:
+                name = cursor[1:].decode('hex').decode('utf-8')
+            except (TypeError, UnicodeError):
+                direction = None
+            if direction not in ('n', 'p'):
+                raise ValueError('Invalid cursor: %r'%cursor)
+
+        if direction == 'n':
+            names = list(islice(self._keys(typename, min=name), size + 1))
+            hasNext = len(names) > size
+            names = names[:size]
+            hasPrevious = name is not None
+        else:
+            tree = self.types.get(typename)
+            if tree is None:
+                return [], None, None
+
+            names = previousNames(tree, name, size)
+            hasPrevious = bool(names) and \
+                previousName(tree, names[0]) is not None
+            hasNext = True
+
+        if not names:
+            return [], None, None
+
+        next = previous = None
+        if hasNext:
+            next = 'n%s'%names[-1].encode('utf-8').encode('hex')
+        if hasPrevious:
+            previous = 'p%s'%names[0].encode('utf-8').encode('hex')
+
+        context = self.context
+        items = [context[name] for name in names]
+
+        if self.PREFETCH:
+            prefetch(items)
+        return items, next, previous
+
+
+@component.adapter(IObjectMovedEvent)
+def itemMoved(event):
+    if ITypeIndexedContainer.providedBy(event.oldParent):
+        ITypeIndex(event.oldParent).removeItem(event.oldName)
+
+    if ITypeIndexedContainer.providedBy(event.newParent):
+        ITypeIndex(event.newParent).addItem(event.newName, event.object)
@@ -20,19 +20,16 @@ from zope.component import getUtilitiesFor
 from zope.schema.interfaces import IVocabularyFactory
 from zope.schema.vocabulary import SimpleTerm, SimpleVocabulary
 
-from zojax.content.type.interfaces import IContentType, IPortalType
+from zojax.content.type.interfaces import IPortalType
+from zojax.content.type.contenttype import availableTypes
 
 
 class AddableContent(object):
     interface.implements(IVocabularyFactory)
 
     def __call__(self, context):
-        contenttype = IContentType(context, None)
-        if contenttype is None:
-            return SimpleVocabulary([])
-
         result = []
-        for ptype in contenttype.listContainedTypes():
+        for ptype in availableTypes(context):
             result.append((ptype.title, ptype.name))
 
         result.sort()
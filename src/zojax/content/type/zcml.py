@@ -15,9 +15,10 @@
 
 $Id$
 """
-import sys, logging
+import re, sys, logging
+from weakref import WeakKeyDictionary
 from zope import component
-from zope.schema import TextLine
+from zope.schema import TextLine, Bool
 from zope.component import queryUtility
 from zope.component.zcml import utility, adapter, handler
 from zope.component.interface import provideInterface
@@ -38,11 +39,15 @@ import zojax.content.type
 from zojax.content.type.interfaces import _
 from zojax.content.type.interfaces import IContent, IReservedNames
 from zojax.content.type.interfaces import IActiveType, IInactiveType
+from zojax.content.type.interfaces import IUnorderedContainer
+from zojax.content.type.interfaces import ITypeIndexedContainer
 from zojax.content.type.interfaces import IContentType, IContentTypeType
 
 from zojax.content.type.contenttype import ContentType
 from zojax.content.type.constraints import \
     ItemTypePrecondition, ContainerTypesConstraint
+from zojax.content.type.constraints import \
+    buildContainment, invalidateContainment
 
 typeOf = type
 
@@ -114,13 +119,34 @@ class IContentTypeDirective(interface.Interface):
         description = u'Custom add form.',
         required = False)
 
+    unordered = Bool(
+        title = u'Unordered',
+        description = u'Container order is native keys order, '\
+                            u'order is not stored.',
+        required = False)
+
+    typeindex = Bool(
+        title = u'Type index',
+        description = u'Container keeps index of items by content type.',
+        required = False)
+
 
 class IReservedNamesDirective(interface.Interface):
     """ The name that can't be used as item name for content container """
 
     names = Tokens(
         title=u'The reserved name.',
-        required = True,
+        required = False,
+        value_type = TextLine())
+
+    prefixes = Tokens(
+        title=u'Reserved prefixes, for example @@ or ++.',
+        required = False,
+        value_type = TextLine())
+
+    patterns = Tokens(
+        title=u'Regular expressions of reserved names.',
+        required = False,
         value_type = TextLine())
 
     for_ = GlobalObject(
@@ -164,7 +190,8 @@ class ClassToTypeAdapter(object):
 def contentHandler(_context, schema, name, title, class_=None,
                    description='', permission='zope.View',
                    contenttype=None, ctclass=None,
-                   type=[], contains=(), containers=(), addform=None):
+                   type=[], contains=(), containers=(), addform=None,
+                   unordered=False, typeindex=False):
 
     if class_ is None:
         type = type + [IInactiveType,]
@@ -231,6 +258,10 @@ def contentHandler(_context, schema, name, title, class_=None,
         if not IContent.implementedBy(class_):
             clsifaces.append(IContent)
         clsifaces.extend(type)
+        if unordered:
+            clsifaces.append(IUnorderedContainer)
+        if typeindex:
+            clsifaces.append(ITypeIndexedContainer)
         interface.classImplements(class_, clsifaces)
         
     # process constraints
@@ -240,6 +271,12 @@ def contentHandler(_context, schema, name, title, class_=None,
         args = (name, contains, containers, _context),
         order = 999998)
 
+    # precompile containment graph, after all constraints
+    _context.action(
+        discriminator = None,
+        callable = buildContainment,
+        order = 1000000)
+
     # added custom interface to contenttype object
     _context.action(
         discriminator = ('zojax.content:contenttypeInterface', contenttype),
@@ -262,6 +299,11 @@ def contentConstraintsHandler(_context, name, contains=(), containers=()):
         args = (name, contains, containers, _context),
         order = 999999)
 
+    _context.action(
+        discriminator = None,
+        callable = buildContainment,
+        order = 1000000)
+
 
 def contentTypeConstraints(name, contains, containers, _context):
     sm = component.getGlobalSiteManager()
@@ -316,33 +358,123 @@ def contentTypeConstraints(name, contains, containers, _context):
                     if cname not in types:
                         types.append(cname)
 
+    invalidateContainment()
+
+
+# provided spec of container -> merged reserved names
+_compiled = WeakKeyDictionary()
+
 
 class ReservedNames(object):
+    """ reserved names registered for one interface, returns names
+    merged for all interfaces provided by container """
     interface.implements(IReservedNames)
 
-    def __init__(self, names):
-        self.names = names
+    def __init__(self, names=(), prefixes=(), patterns=(), registry=None):
+        self.names = tuple(names)
+        self.prefixes = tuple(prefixes)
+        self.patterns = tuple(patterns)
+        self.registry = registry
+
+    def add(self, names=(), prefixes=(), patterns=()):
+        for attr, values in (('names', names),
+                             ('prefixes', prefixes),
+                             ('patterns', patterns)):
+            current = list(getattr(self, attr))
+            for value in values:
+                if value not in current:
+                    current.append(value)
+            setattr(self, attr, tuple(current))
+
+    def isReserved(self, name):
+        return CompiledReservedNames((self,)).isReserved(name)
 
     def __call__(self, context):
-        return self
+        spec = interface.providedBy(context)
+        try:
+            return _compiled[spec]
+        except KeyError:
+            pass
+
+        registry = self.registry
+        if registry is None:
+            rules = [self]
+        else:
+            rules = [registry.registered((iface,), IReservedNames)
+                     for iface in spec.__iro__]
+            rules = [rule for rule in rules
+                     if isinstance(rule, ReservedNames)]
+
+        compiled = _compiled[spec] = CompiledReservedNames(rules)
+        return compiled
 
 
-def reservedNamesHandler(_context, names, for_):
+class CompiledReservedNames(object):
+    """ names set, prefixes and one pattern for all rules """
+    interface.implements(IReservedNames)
+
+    def __init__(self, rules):
+        names = []
+        prefixes = []
+        patterns = []
+        for rule in rules:
+            names.extend(rule.names)
+            prefixes.extend(rule.prefixes)
+            patterns.extend(rule.patterns)
+
+        self.names = tuple(names)
+        self.prefixes = tuple(prefixes)
+        self.patterns = tuple(patterns)
+
+        self.nameset = frozenset(names)
+        self.pattern = None
+        if patterns:
+            self.pattern = re.compile(
+                '|'.join(['(?:%s)\Z'%pattern for pattern in patterns]),
+                re.UNICODE)
+
+    def isReserved(self, name):
+        if name in self.nameset:
+            return True
+        if self.prefixes and name.startswith(self.prefixes):
+            return True
+        if self.pattern is not None and self.pattern.match(name):
+            return True
+        return False
+
+
+def invalidateReservedNames():
+    _compiled.clear()
+
+
+def reservedNamesHandler(_context, for_, names=(), prefixes=(), patterns=()):
+    for pattern in patterns:
+        try:
+            re.compile(pattern)
+        except re.error, err:
+            raise ValueError('Invalid reserved names pattern.', pattern, err)
+
     _context.action(
-        discriminator = ('zojax.content:reservedNames', for_, tuple(names)),
+        discriminator = ('zojax.content:reservedNames', for_, tuple(names),
+                         tuple(prefixes), tuple(patterns)),
         callable = reservedNames,
-        args = (names, for_))
+        args = (names, for_, prefixes, patterns))
 
 
-def reservedNames(names, for_):
+def reservedNames(names, for_, prefixes=(), patterns=()):
     sm = component.getSiteManager()
-    rnames = sm.adapters.lookup((for_,), IReservedNames)
-    if rnames is None:
-        rnames = ReservedNames(names)
+    rnames = sm.adapters.registered((for_,), IReservedNames)
+    if not isinstance(rnames, ReservedNames):
+        rnames = ReservedNames(registry=sm.adapters)
         sm.registerAdapter(rnames, (for_,), IReservedNames)
-    else:
-        nm = list(rnames.names)
-        for name in names:
-            if name not in nm:
-                nm.append(name)
-        rnames.names = tuple(nm)
+
+    rnames.add(names, prefixes, patterns)
+    invalidateReservedNames()
+
+
+try:
+    from zope.testing.cleanup import addCleanUp
+except ImportError:
+    pass
+else:
+    addCleanUp(invalidateReservedNames)